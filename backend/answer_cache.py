@@ -0,0 +1,123 @@
+import os
+import time
+import uuid
+import base64
+import logging
+import numpy as np
+from cache import create_cache
+from metrics import CACHE_LOOKUPS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _pack_vector(vector):
+    """Query embedding as base64 float16, about a quarter of its size as a JSON float list"""
+    return base64.b64encode(np.asarray(vector, dtype=np.float16).tobytes()).decode("ascii")
+
+
+def _unpack_vector(packed):
+    return np.frombuffer(base64.b64decode(packed), dtype=np.float16).astype(np.float32)
+
+
+class SemanticAnswerCache:
+    """
+    Per-video answers keyed by query embedding. A new question reuses an answer when its
+    cosine similarity to a cached question is above `threshold`. Each video has a small index
+    of packed query vectors, tied to a fingerprint of the processed transcript and dropped when
+    it changes; every answer text is its own entry, read only on a hit.
+    """
+
+    def __init__(self, threshold=0.92, ttl=3600, max_per_video=100):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_per_video = max_per_video
+        self.store = create_cache("answers", max_entries=20000, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _index_key(self, video_id):
+        return f"index:{video_id}"
+
+    def _answer_key(self, video_id, entry_id):
+        return f"answer:{video_id}:{entry_id}"
+
+    def _entries(self, video_id, fingerprint):
+        record = self.store.get(self._index_key(video_id))
+        if record is None:
+            return []
+        if record["fingerprint"] != fingerprint:
+            self.invalidate(video_id)
+            logger.info(f"Processed transcript changed for {video_id}, dropping cached answers")
+            return []
+        now = time.time()
+        return [e for e in record["entries"] if now - e["created_at"] < self.ttl]
+
+    def lookup(self, video_id, fingerprint, query_vector):
+        """Cached answer for a semantically equivalent question, or None"""
+        entries = self._entries(video_id, fingerprint)
+        if entries:
+            matrix = np.stack([_unpack_vector(e["vector"]) for e in entries])
+            query = np.asarray(query_vector, dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query) or 1.0)
+            scores = matrix @ query / np.where(norms == 0, 1.0, norms)
+            best = int(np.argmax(scores))
+            if scores[best] >= self.threshold:
+                cached = self.store.get(self._answer_key(video_id, entries[best]["id"]))
+                if cached is not None:
+                    self.hits += 1
+                    CACHE_LOOKUPS.inc(cache="semantic_answers", result="hit")
+                    logger.info(f"Semantic cache hit for {video_id} (similarity {scores[best]:.3f} to '{cached['query']}')")
+                    return cached["answer"]
+        self.misses += 1
+        CACHE_LOOKUPS.inc(cache="semantic_answers", result="miss")
+        return None
+
+    def store_answer(self, video_id, fingerprint, query, query_vector, answer):
+        entry_id = uuid.uuid4().hex[:16]
+        self.store.set(self._answer_key(video_id, entry_id), {"query": query, "answer": answer})
+
+        def append(record):
+            now = time.time()
+            if record is None or record["fingerprint"] != fingerprint:
+                record = {"fingerprint": fingerprint, "entries": []}
+            entries = record["entries"] + [{"id": entry_id, "vector": _pack_vector(query_vector), "created_at": now}]
+            kept = [e for e in entries if now - e["created_at"] < self.ttl][-self.max_per_video:]
+            kept_ids = {e["id"] for e in kept}
+            record["entries"] = kept
+            return record, [e["id"] for e in entries if e["id"] not in kept_ids]
+
+        # Atomic so concurrent workers appending to the same video don't lose each other's entries
+        for dropped in self.store.update(self._index_key(video_id), append):
+            self.store.delete(self._answer_key(video_id, dropped))
+
+    def invalidate(self, video_id):
+        """Forget a video's answers; the answer entries themselves expire with the TTL"""
+        self.store.delete(self._index_key(video_id))
+        self.invalidations += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "threshold": self.threshold,
+            "ttl": self.ttl,
+        }
+
+
+_answer_cache = None
+
+
+def get_answer_cache():
+    """Process-wide answer cache configured from ANSWER_CACHE_* environment variables"""
+    global _answer_cache
+    if _answer_cache is None:
+        _answer_cache = SemanticAnswerCache(
+            threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92")),
+            ttl=int(os.getenv("ANSWER_CACHE_TTL", "3600")),
+        )
+    return _answer_cache
@@ -0,0 +1,115 @@
+"""Cleaning + chunking microbenchmark: the previous whole-string regex passes and
+RecursiveCharacterTextSplitter vs the single-pass streaming chunker.
+
+Reports total time, time to the first chunk (when embedding can start) and peak traced memory.
+
+Usage:
+    python benchmarks/bench_chunking.py --sizes 20000,100000,500000 --repeat 5
+"""
+
+import os
+import re
+import sys
+import time
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from timed_transcript import TimedTranscript
+from chunking import clean_pieces, iter_chunks, chunk_sizes
+from stub_services import synthetic_segments
+
+
+def legacy_clean_text(text):
+    text = re.sub(r'\[.*?\]', '', text)
+    text = re.sub(r'\(.*?\)', '', text)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'(\w)\.(\w)', r'\1. \2', text)
+    text = re.sub(r'([.!?]){2,}', r'\1', text)
+    text = re.sub(r"(\w+)'(\w+)", r"\1'\2", text)
+    return text.strip()
+
+
+def legacy_pipeline(transcript):
+    """clean_transcript + create_semantic_chunks as they were before the streaming chunker"""
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    segments = [{"text": legacy_clean_text(segment), "start": start} for start, segment in transcript.segments()]
+    cleaned = TimedTranscript.from_segments(segments)
+    chunk_size, chunk_overlap = chunk_sizes(len(cleaned))
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=["\n\n", "\n", ". ", "! ", "? ", ";", ",", " ", ""],
+        keep_separator=True,
+        add_start_index=True
+    )
+    chunks = splitter.create_documents([str(cleaned)])
+    for i, chunk in enumerate(chunks):
+        chunk.page_content = chunk.page_content.strip()
+        chunk.metadata["position"] = i
+        chunk.metadata["total_chunks"] = len(chunks)
+        start_index = chunk.metadata["start_index"]
+        chunk.metadata["start_time"] = cleaned.time_at(start_index)
+        chunk.metadata["end_time"] = cleaned.time_at(start_index + len(chunk.page_content))
+    yield from chunks
+
+
+def streaming_pipeline(transcript):
+    segments = []
+    yield from iter_chunks(clean_pieces(transcript, segments), *chunk_sizes(len(transcript)))
+
+
+def measure(pipeline, transcript, repeat):
+    """(best total seconds, best seconds to first chunk, peak traced MB, chunk count)"""
+    totals, firsts = [], []
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        first = None
+        count = 0
+        for _ in pipeline(transcript):
+            if first is None:
+                first = time.perf_counter() - start
+            count += 1
+        totals.append(time.perf_counter() - start)
+        firsts.append(first or 0.0)
+
+    tracemalloc.start()
+    for _ in pipeline(transcript):
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(totals), min(firsts), peak / (1024 * 1024), count
+
+
+def noisy_transcript(chars):
+    """Synthetic captions with the bracketed notes and repeated punctuation the cleaner strips"""
+    segments = synthetic_segments("en", chars)
+    for i, segment in enumerate(segments):
+        if i % 5 == 0:
+            segment["text"] += " [Music]"
+        if i % 3 == 0:
+            segment["text"] += "..."
+    return TimedTranscript.from_segments(segments)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="20000,100000,500000")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for size in map(int, args.sizes.split(",")):
+        transcript = noisy_transcript(size)
+        print(f"{size} chars")
+        for label, pipeline in (("legacy", legacy_pipeline), ("streaming", streaming_pipeline)):
+            total, first, peak, count = measure(pipeline, transcript, args.repeat)
+            print(f"  {label:<10} {total * 1000:8.1f}ms total  {first * 1000:8.1f}ms to first chunk  "
+                  f"{peak:7.2f}MB peak  {count} chunks")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Embedding throughput on CPU: the old default HuggingFaceEmbeddings vs EmbeddingService.
+
+Usage:
+    python benchmarks/bench_embeddings.py --chunks 500 --batch-size 64 --threads 4 [--backend onnx]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embeddings import EmbeddingService
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+WORDS = ("video transcript model training data network layer attention token speaker audience "
+         "example result question answer python function memory latency throughput cache index").split()
+
+
+def synthetic_chunks(n, chars=800, seed=0):
+    rng = random.Random(seed)
+    chunks = []
+    for i in range(n):
+        words = []
+        while sum(len(w) + 1 for w in words) < chars:
+            words.append(rng.choice(WORDS))
+        chunks.append(f"chunk {i}: " + " ".join(words))
+    return chunks
+
+
+def measure(label, embed, chunks):
+    start = time.perf_counter()
+    embed(chunks)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {len(chunks) / elapsed:8.1f} chunks/sec ({elapsed:.2f}s)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--threads", type=int, default=os.cpu_count())
+    parser.add_argument("--backend", default="torch", choices=["torch", "onnx"])
+    args = parser.parse_args()
+
+    chunks = synthetic_chunks(args.chunks)
+
+    from langchain_huggingface import HuggingFaceEmbeddings
+    baseline = HuggingFaceEmbeddings(model_name=MODEL_NAME)
+    baseline.embed_documents(chunks[:8])  # load weights before timing
+    measure("baseline (defaults)", baseline.embed_documents, chunks)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        service = EmbeddingService(MODEL_NAME, batch_size=args.batch_size, torch_threads=args.threads,
+                                   backend=args.backend, cache_dir=cache_dir)
+        service.model.embed_documents(chunks[:8])
+        measure(f"service cold (batch={args.batch_size}, threads={args.threads}, {service.backend})",
+                service.embed_documents, chunks)
+        measure("service warm (vector cache)", service.embed_documents, chunks)
+
+        # A fresh service sharing the directory reads vectors back through the memory map
+        reopened = EmbeddingService(MODEL_NAME, batch_size=args.batch_size, backend=service.backend, cache_dir=cache_dir)
+        measure("new process, mmap cache", reopened.embed_documents, chunks)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""Offline benchmark of the query pipeline against local stand-ins for Groq, the translator and YouTube.
+
+Runs answer_youtube_video directly ("pipeline") and/or the /query endpoint of an in-process
+uvicorn server ("endpoint") over transcripts from 1k to 200k chars in several languages.
+For each transcript it reports the cold first-question latency, then p50/p99 latency and
+throughput for --users concurrent users, plus per-stage timings and peak RSS.
+
+Usage:
+    python benchmarks/bench_pipeline.py --mode both --sizes 1000,15000,50000,200000 --languages en,es,de \\
+        --users 8 --queries 4 --llm-latency 0.3 --llm-429-rate 0.05 --output results.json
+    python benchmarks/bench_pipeline.py ... --baseline results.json --max-regression 1.25
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import resource
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_services import StubServices, ServiceConfig, StubTranslator, LANGUAGES
+from health_load_test import percentile
+
+QUESTIONS = [
+    "How is the model trained?",
+    "What does the network use attention for?",
+    "How long does training take?",
+    "What do they measure before shipping?",
+    "Which machines are used for training?",
+    "What is predicted in the sequence?",
+    "Why is memory important here?",
+    "Who are the users mentioned?",
+]
+
+
+def configure_environment(args, stub_url, workdir):
+    """Point the backend at the stubs and fresh cache directories; must run before it is imported"""
+    os.environ.update({
+        "GROQ_API_KEY": "bench",
+        "GROQ_API_BASE": stub_url,
+        "GROQ_RPM": str(args.groq_rpm),
+        "GROQ_TPM": str(args.groq_tpm),
+        "CACHE_BACKEND": "memory",
+        "INDEX_CACHE_DIR": os.path.join(workdir, "indexes"),
+        "TRANSLATION_CACHE_PATH": os.path.join(workdir, "translations.db"),
+        "JOB_EXECUTOR": "thread",
+        "WARMUP_ON_STARTUP": "1",
+    })
+    if not args.warm_embedding_cache:
+        os.environ["EMBEDDING_CACHE_DIR"] = os.path.join(workdir, "embeddings")
+    if not args.answer_cache:
+        # Similar benchmark questions would otherwise be answered from the semantic cache
+        os.environ["ANSWER_CACHE_THRESHOLD"] = "2"
+
+
+def install_stubs(stub_url):
+    """Route translation and transcript fetches to the stubs through the backend's own seams"""
+    import requests
+    import translation
+    import app
+    from timed_transcript import TimedTranscript
+
+    translation._default_translator = lambda source, target: StubTranslator(stub_url, source, target)
+    session = requests.Session()
+
+    def get_transcript(video_id):
+        response = session.get(f"{stub_url}/transcripts/{video_id}", timeout=60)
+        if response.status_code == 429:
+            return "Error: YouTube is rate limiting requests (429)"
+        if response.status_code != 200:
+            return "No captions available for this video"
+        return TimedTranscript.from_segments(response.json())
+
+    app.get_transcript = get_transcript
+    return get_transcript
+
+
+def stage_timings():
+    """{stage: (count, total seconds)} from the in-process metrics registry"""
+    from metrics import STAGE_SECONDS
+    with STAGE_SECONDS._lock:
+        return {key[0]: (counts[-1], total) for key, (counts, total) in STAGE_SECONDS._values.items()}
+
+
+def stage_delta(before, after):
+    delta = {}
+    for stage, (count, total) in after.items():
+        prev_count, prev_total = before.get(stage, (0, 0.0))
+        if count > prev_count:
+            delta[stage] = {"count": count - prev_count, "mean_ms": round((total - prev_total) / (count - prev_count) * 1000, 1)}
+    return delta
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def run_users(fn, users, queries):
+    """Run fn(question) for `users` concurrent users asking `queries` questions each"""
+    latencies, errors = [], 0
+    lock = threading.Lock()
+
+    def user(u):
+        nonlocal errors
+        rng = random.Random(u)
+        for i in range(queries):
+            question = f"{rng.choice(QUESTIONS)} (user {u}, question {i})"
+            start = time.perf_counter()
+            ok = fn(question)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed * 1000)
+                errors += 0 if ok else 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        list(pool.map(user, range(users)))
+    wall = time.perf_counter() - start
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0,
+    }
+
+
+def bench_pipeline(video_id, get_transcript, users, queries):
+    from yt_chat_rag_using_langchain import answer_youtube_video
+    from transcript_helper import is_transcript_error
+
+    transcript = get_transcript(video_id)
+    if is_transcript_error(transcript):
+        return {"error": transcript}
+
+    def ask(question):
+        # answer_youtube_video raises on any failure, so error replies can't pass as answers
+        try:
+            answer_youtube_video(transcript, question, video_id)
+            return True
+        except Exception:
+            return False
+
+    start = time.perf_counter()
+    ask(QUESTIONS[0])
+    cold_ms = (time.perf_counter() - start) * 1000
+    return {"cold_ms": round(cold_ms, 1), **run_users(ask, users, queries)}
+
+
+def bench_endpoint(video_id, base_url, users, queries, poll_interval=0.1, timeout=600):
+    import requests
+
+    def ask(question):
+        session = requests.Session()
+        response = session.post(f"{base_url}/query", json={"videoId": video_id, "query": question}, timeout=timeout)
+        if response.status_code != 200:
+            return False
+        body = response.json()
+        job_id = body.get("job_id")
+        # Long transcripts go through the job queue; a question is done when its job is
+        deadline = time.time() + timeout
+        while job_id and body.get("status") not in ("done", "failed") and time.time() < deadline:
+            time.sleep(poll_interval)
+            body = session.get(f"{base_url}/jobs/{job_id}", timeout=30).json()
+        return body.get("status", "done") == "done" and not body.get("error")
+
+    start = time.perf_counter()
+    ask(QUESTIONS[0])
+    cold_ms = (time.perf_counter() - start) * 1000
+    return {"cold_ms": round(cold_ms, 1), **run_users(ask, users, queries)}
+
+
+def start_api_server():
+    import uvicorn
+    import requests
+    import app
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, name="bench-api", daemon=True).start()
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 300
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{base_url}/ready", timeout=1).status_code == 200:
+                return server, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError("API server did not become ready")
+
+
+def print_result(label, result):
+    if "error" in result:
+        print(f"{label:<28} ERROR {result['error']}")
+        return
+    print(f"{label:<28} cold={result['cold_ms']:>9.1f}ms p50={result['p50_ms']:>8.1f}ms p99={result['p99_ms']:>8.1f}ms "
+          f"{result['throughput_rps']:>6.2f} req/s errors={result['errors']}/{result['requests']} rss={result['peak_rss_mb']:.0f}MB")
+    stages = ", ".join(f"{stage} {info['mean_ms']:.0f}ms" for stage, info in sorted(result["stages"].items()))
+    print(f"{'':<28} stages: {stages}")
+
+
+def compare(results, baseline_path, max_regression):
+    """Regressed (key, metric, baseline, current) tuples for p50/p99 latency and throughput"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    regressions = []
+    for key, current in results.items():
+        old = baseline.get(key)
+        if not old or "error" in old or "error" in current:
+            continue
+        for metric in ("p50_ms", "p99_ms"):
+            if current[metric] > old[metric] * max_regression:
+                regressions.append((key, metric, old[metric], current[metric]))
+        if current["throughput_rps"] * max_regression < old["throughput_rps"]:
+            regressions.append((key, "throughput_rps", old["throughput_rps"], current["throughput_rps"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["pipeline", "endpoint", "both"], default="both")
+    parser.add_argument("--sizes", default="1000,15000,50000,200000", help="transcript lengths in chars")
+    parser.add_argument("--languages", default="en,es", help=f"any of {','.join(LANGUAGES)}")
+    parser.add_argument("--transcripts-dir", help="recorded <video_id>.json segment files, used with --video-ids")
+    parser.add_argument("--video-ids", help="comma-separated recorded video ids instead of synthetic transcripts")
+    parser.add_argument("--users", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=3, help="questions per user")
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--llm-token-ms", type=float, default=2.0)
+    parser.add_argument("--llm-429-rate", type=float, default=0.0)
+    parser.add_argument("--translator-latency", type=float, default=0.05)
+    parser.add_argument("--transcript-latency", type=float, default=0.2)
+    parser.add_argument("--transcript-429-rate", type=float, default=0.0)
+    parser.add_argument("--groq-rpm", type=int, default=1000)
+    parser.add_argument("--groq-tpm", type=int, default=10_000_000)
+    parser.add_argument("--answer-cache", action="store_true", help="leave the semantic answer cache on")
+    parser.add_argument("--warm-embedding-cache", action="store_true", help="reuse the regular embedding vector cache")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="JSON from a previous --output run to compare against")
+    parser.add_argument("--max-regression", type=float, default=1.25)
+    args = parser.parse_args()
+
+    services = StubServices(
+        llm=ServiceConfig(args.llm_latency, jitter=args.llm_latency / 5, rate_429=args.llm_429_rate),
+        translator=ServiceConfig(args.translator_latency),
+        transcripts=ServiceConfig(args.transcript_latency, rate_429=args.transcript_429_rate),
+        llm_token_ms=args.llm_token_ms,
+        transcripts_dir=args.transcripts_dir,
+    ).start()
+
+    workdir = tempfile.mkdtemp(prefix="tubemate-bench-")
+    configure_environment(args, services.url, workdir)
+    get_transcript = install_stubs(services.url)
+
+    if args.video_ids:
+        video_ids = args.video_ids.split(",")
+    else:
+        video_ids = [f"{lang}-{size}" for size in map(int, args.sizes.split(",")) for lang in args.languages.split(",")]
+
+    modes = ["pipeline", "endpoint"] if args.mode == "both" else [args.mode]
+    base_url = None
+    if "endpoint" in modes:
+        _, base_url = start_api_server()
+    else:
+        from yt_chat_rag_using_langchain import warm_up
+        warm_up()
+
+    results = {}
+    for mode in modes:
+        for video_id in video_ids:
+            # Synthetic videos get a per-mode seed so the endpoint run starts cold too
+            run_id = video_id if args.video_ids else f"{video_id}-{mode}"
+            before = stage_timings()
+            if mode == "pipeline":
+                result = bench_pipeline(run_id, get_transcript, args.users, args.queries)
+            else:
+                result = bench_endpoint(run_id, base_url, args.users, args.queries)
+            result["stages"] = stage_delta(before, stage_timings())
+            result["peak_rss_mb"] = round(peak_rss_mb(), 1)
+            key = f"{mode}:{video_id}"
+            results[key] = result
+            print_result(key, result)
+
+        if args.video_ids:
+            # Recorded videos can't be re-seeded; drop their indexes so the next mode builds them again
+            from index_cache import get_index_cache
+            for video_id in video_ids:
+                get_index_cache().invalidate(video_id)
+
+    print(f"Stub traffic: {json.dumps(services.stats())}")
+    print(f"Peak RSS: {peak_rss_mb():.0f}MB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "results": results, "stubs": services.stats()}, f, indent=2)
+
+    status = 0
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.max_regression)
+        for key, metric, old, new in regressions:
+            print(f"REGRESSION {key} {metric}: {old} -> {new}")
+        status = 1 if regressions else 0
+    services.stop()
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
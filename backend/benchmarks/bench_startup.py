@@ -0,0 +1,71 @@
+"""Startup benchmark: import time of the API module and time until /health and /ready answer.
+
+Usage:
+    python benchmarks/bench_startup.py --runs 5 [--port 5055]
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_time():
+    """Seconds to `import app` in a fresh interpreter"""
+    code = "import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def wait_for(url, deadline):
+    while time.time() < deadline:
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.05)
+    return False
+
+
+def server_times(port, timeout):
+    """(seconds until /health is 200, seconds until /ready is 200) for a fresh uvicorn process"""
+    start = time.time()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--port", str(port)],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        base = f"http://127.0.0.1:{port}"
+        live = time.time() - start if wait_for(f"{base}/health", start + timeout) else float("nan")
+        ready = time.time() - start if wait_for(f"{base}/ready", start + timeout) else float("nan")
+        return live, ready
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--timeout", type=float, default=300)
+    args = parser.parse_args()
+
+    imports = [import_time() for _ in range(args.runs)]
+    print(f"import app:        median {statistics.median(imports):.2f}s  max {max(imports):.2f}s")
+
+    results = [server_times(args.port, args.timeout) for _ in range(args.runs)]
+    live = [r[0] for r in results]
+    ready = [r[1] for r in results]
+    print(f"time to /health:   median {statistics.median(live):.2f}s  max {max(live):.2f}s")
+    print(f"time to /ready:    median {statistics.median(ready):.2f}s  max {max(ready):.2f}s")
+
+
+if __name__ == "__main__":
+    main()
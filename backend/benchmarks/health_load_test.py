@@ -0,0 +1,87 @@
+"""Load test: /health latency must stay flat while N /query requests are in flight.
+
+Usage:
+    python benchmarks/health_load_test.py --url http://localhost:5000 --concurrency 8 --video-id <id>
+"""
+
+import time
+import argparse
+import statistics
+import threading
+import requests
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def sample_health(url, duration, interval, stop_event=None):
+    """Hit /health every `interval` seconds for `duration` seconds, returning latencies in ms"""
+    latencies = []
+    deadline = time.time() + duration
+    while time.time() < deadline and not (stop_event and stop_event.is_set()):
+        start = time.perf_counter()
+        try:
+            requests.get(f"{url}/health", timeout=30)
+            latencies.append((time.perf_counter() - start) * 1000)
+        except requests.RequestException:
+            latencies.append(30000.0)
+        time.sleep(interval)
+    return latencies
+
+
+def fire_queries(url, video_id, concurrency, query):
+    def run(i):
+        try:
+            requests.post(f"{url}/query", json={"videoId": video_id, "query": f"{query} ({i})"}, timeout=600)
+        except requests.RequestException:
+            pass
+
+    threads = [threading.Thread(target=run, args=(i,), daemon=True) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    return threads
+
+
+def summarize(label, latencies):
+    print(f"{label}: n={len(latencies)} "
+          f"p50={percentile(latencies, 50):.1f}ms p99={percentile(latencies, 99):.1f}ms "
+          f"max={max(latencies or [0]):.1f}ms mean={statistics.mean(latencies or [0]):.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--video-id", default="dQw4w9WgXcQ")
+    parser.add_argument("--query", default="What is this video about?")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--interval", type=float, default=0.1)
+    parser.add_argument("--max-ratio", type=float, default=3.0,
+                        help="fail if loaded p99 exceeds idle p99 by more than this factor")
+    args = parser.parse_args()
+
+    idle = sample_health(args.url, min(args.duration, 5.0), args.interval)
+    summarize("idle   /health", idle)
+
+    threads = fire_queries(args.url, args.video_id, args.concurrency, args.query)
+    loaded = sample_health(args.url, args.duration, args.interval)
+    summarize(f"loaded /health ({args.concurrency} queries in flight)", loaded)
+
+    for t in threads:
+        t.join(timeout=0)
+
+    idle_p99 = max(percentile(idle, 99), 5.0)
+    loaded_p99 = percentile(loaded, 99)
+    if loaded_p99 > idle_p99 * args.max_ratio:
+        print(f"FAIL: /health p99 grew {loaded_p99 / idle_p99:.1f}x under load")
+        raise SystemExit(1)
+    print("PASS: /health latency stayed flat under load")
+
+
+if __name__ == "__main__":
+    main()
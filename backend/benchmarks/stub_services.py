@@ -0,0 +1,275 @@
+"""Local stand-ins for Groq, the translator and YouTube transcripts, for offline benchmarks.
+
+One threaded HTTP server answers:
+    POST /openai/v1/chat/completions   Groq (OpenAI-compatible) chat completions, streaming or not
+    POST /translate                    {"texts": [...], "source": "es", "target": "en"} -> {"translations": [...]}
+    GET  /transcripts/<video_id>       segment list [{"text", "start", "duration"}]
+
+Each service has its own latency and 429 rate. Transcripts are synthetic ("<lang>-<chars>[-<seed>]",
+e.g. "es-50000") or loaded from a directory of recorded <video_id>.json segment files.
+
+Usage (standalone, to point a real server at it):
+    python benchmarks/stub_services.py --port 5099 --llm-latency 0.5 --llm-429-rate 0.05
+"""
+
+import os
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Parallel word lists: the stub translator maps a word to the English word at the same index
+WORDS = {
+    "en": "the model learns from data and the network uses attention to predict the next token in a long sequence while "
+          "training takes many hours on large machines so we measure speed memory and quality before we ship it to users".split(),
+    "es": "el modelo aprende de datos y la red usa atención para predecir el siguiente token en una larga secuencia mientras "
+          "entrenar toma muchas horas en grandes máquinas así medimos velocidad memoria y calidad antes de enviarlo a usuarios".split(),
+    "de": "das modell lernt aus daten und das netz nutzt aufmerksamkeit um das nächste token in einer langen folge vorherzusagen "
+          "während training viele stunden auf großen maschinen dauert also messen wir tempo speicher und qualität vor der auslieferung an nutzer".split(),
+    "fr": "le modèle apprend des données et le réseau utilise attention pour prédire le prochain jeton dans une longue séquence pendant "
+          "entraînement prend beaucoup heures sur grandes machines alors nous mesurons vitesse mémoire et qualité avant de livrer aux utilisateurs".split(),
+    "hi": "मॉडल डेटा से सीखता है और नेटवर्क ध्यान का उपयोग करता है ताकि अगले टोकन का अनुमान लंबे क्रम में लगाए जबकि "
+          "प्रशिक्षण में कई घंटे बड़ी मशीनों पर लगते हैं इसलिए हम गति स्मृति और गुणवत्ता मापते हैं भेजने से पहले उपयोगकर्ताओं को".split(),
+}
+LANGUAGES = tuple(WORDS)
+
+ANSWER = ("The speaker explains how the model is trained on data and why attention helps it predict the next "
+          "token (at 1:23). They also compare speed, memory and quality before release (at 4:56).")
+
+
+def synthetic_segments(language, chars, seed=0, words_per_segment=12, seconds_per_segment=4.0):
+    """Deterministic transcript segments of roughly `chars` characters in one language"""
+    rng = random.Random(f"{language}:{chars}:{seed}")
+    vocabulary = WORDS[language]
+    segments, total, start = [], 0, 0.0
+    while total < chars:
+        text = " ".join(rng.choice(vocabulary) for _ in range(words_per_segment))
+        segments.append({"text": text, "start": round(start, 2), "duration": seconds_per_segment})
+        total += len(text) + 1
+        start += seconds_per_segment
+    return segments
+
+
+def translate_words(text, source, target="en"):
+    lookup = dict(zip(WORDS.get(source, ()), WORDS.get(target, ())))
+    return " ".join(lookup.get(word.lower(), word) for word in text.split())
+
+
+class ServiceConfig:
+    def __init__(self, latency=0.0, jitter=0.0, rate_429=0.0, retry_after=1):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.requests = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def delay(self, extra=0.0):
+        time.sleep(max(0.0, self.latency + extra + random.uniform(-self.jitter, self.jitter)))
+
+    def should_throttle(self):
+        with self._lock:
+            self.requests += 1
+            if random.random() < self.rate_429:
+                self.throttled += 1
+                return True
+        return False
+
+    def stats(self):
+        return {"requests": self.requests, "throttled": self.throttled}
+
+
+class StubServices:
+    """Runs the stub HTTP server on a background thread"""
+
+    def __init__(self, port=0, llm=None, translator=None, transcripts=None, llm_token_ms=2.0, transcripts_dir=None):
+        self.llm = llm or ServiceConfig()
+        self.translator = translator or ServiceConfig()
+        self.transcripts = transcripts or ServiceConfig()
+        self.llm_token_ms = llm_token_ms
+        self.transcripts_dir = transcripts_dir
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="stub-services", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def stats(self):
+        return {"llm": self.llm.stats(), "translator": self.translator.stats(), "transcripts": self.transcripts.stats()}
+
+    def segments(self, video_id):
+        if self.transcripts_dir:
+            path = os.path.join(self.transcripts_dir, f"{video_id}.json")
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    return json.load(f)
+        match = re.fullmatch(r"([a-z]{2})-(\d+)(?:-(\w+))?", video_id)
+        if not match or match.group(1) not in WORDS:
+            return None
+        return synthetic_segments(match.group(1), int(match.group(2)), seed=match.group(3) or 0)
+
+    def complete(self, prompt):
+        """Canned completion: transcript clean-up prompts echo the transcript, everything else gets an answer"""
+        cleanup = re.search(r"RAW TRANSCRIPT:\s*(.*?)\s*IMPROVED TRANSCRIPT:", prompt, re.DOTALL)
+        if cleanup:
+            return cleanup.group(1)
+        if "SUMMARY:" in prompt:
+            return "This part covers how the model is trained and how its speed and quality are measured."
+        return ANSWER
+
+    def _handler(self):
+        services = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _json(self, status, payload, headers=None):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _throttled(self, config):
+                self._json(429, {"error": {"message": "Rate limit reached", "type": "tokens", "code": "rate_limit_exceeded"}},
+                           {"Retry-After": str(config.retry_after)})
+
+            def _body(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(length) or b"{}")
+
+            def do_GET(self):
+                if not self.path.startswith("/transcripts/"):
+                    return self._json(404, {"error": "not found"})
+                config = services.transcripts
+                config.delay()
+                if config.should_throttle():
+                    return self._throttled(config)
+                segments = services.segments(self.path.rsplit("/", 1)[-1])
+                if segments is None:
+                    return self._json(404, {"error": "no transcript"})
+                self._json(200, segments)
+
+            def do_POST(self):
+                body = self._body()
+                if self.path == "/translate":
+                    config = services.translator
+                    config.delay()
+                    if config.should_throttle():
+                        return self._throttled(config)
+                    texts = [translate_words(t, body.get("source", "en"), body.get("target", "en")) for t in body.get("texts", [])]
+                    return self._json(200, {"translations": texts})
+                if self.path.endswith("/chat/completions"):
+                    return self._chat(body)
+                self._json(404, {"error": "not found"})
+
+            def _chat(self, body):
+                config = services.llm
+                config.delay()
+                if config.should_throttle():
+                    return self._throttled(config)
+                prompt = "\n".join(m.get("content", "") for m in body.get("messages", []) if isinstance(m.get("content"), str))
+                text = services.complete(prompt)
+                words = text.split(" ")
+                usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(words), "total_tokens": len(prompt) // 4 + len(words)}
+                model = body.get("model", "stub")
+                if not body.get("stream"):
+                    # Generation time grows with the completion, like a real model
+                    time.sleep(len(words) * services.llm_token_ms / 1000.0)
+                    return self._json(200, {
+                        "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()), "model": model,
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                        "usage": usage,
+                    })
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for i, word in enumerate(words):
+                    time.sleep(services.llm_token_ms / 1000.0)
+                    chunk = {
+                        "id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                        "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}, "finish_reason": None}],
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                final = {
+                    "id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "x_groq": {"usage": usage},
+                }
+                self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+                self.wfile.flush()
+                self.close_connection = True
+
+        return Handler
+
+
+class StubTranslator:
+    """Translator object for translate_text that calls the stub /translate endpoint"""
+
+    def __init__(self, url, source, target):
+        import requests
+        self.url = url
+        self.source = source
+        self.target = target
+        self.session = requests.Session()
+
+    def translate_batch(self, texts):
+        response = self.session.post(f"{self.url}/translate", json={"texts": texts, "source": self.source, "target": self.target}, timeout=60)
+        response.raise_for_status()
+        return response.json()["translations"]
+
+    def translate(self, text):
+        return self.translate_batch([text])[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=5099)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--llm-token-ms", type=float, default=2.0)
+    parser.add_argument("--llm-429-rate", type=float, default=0.0)
+    parser.add_argument("--translator-latency", type=float, default=0.1)
+    parser.add_argument("--transcript-latency", type=float, default=0.2)
+    parser.add_argument("--transcript-429-rate", type=float, default=0.0)
+    parser.add_argument("--transcripts-dir")
+    args = parser.parse_args()
+
+    services = StubServices(
+        port=args.port,
+        llm=ServiceConfig(args.llm_latency, rate_429=args.llm_429_rate),
+        translator=ServiceConfig(args.translator_latency),
+        transcripts=ServiceConfig(args.transcript_latency, rate_429=args.transcript_429_rate),
+        llm_token_ms=args.llm_token_ms,
+        transcripts_dir=args.transcripts_dir,
+    ).start()
+    print(f"Stub services on {services.url} (set GROQ_API_BASE={services.url})", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        services.stop()
+
+
+if __name__ == "__main__":
+    main()
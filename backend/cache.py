@@ -0,0 +1,424 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def estimate_size(value):
+    """Rough size in bytes of a cached value"""
+    if isinstance(value, str):
+        return len(value.encode("utf-8", errors="ignore"))
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class CacheBackend:
+    """Interface shared by the in-process, SQLite and Redis caches"""
+
+    def get(self, key, default=None):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def update(self, key, fn, ttl=None):
+        """
+        Atomic read-modify-write: fn(current value or None) returns (new value, result); the new
+        value is stored and result returned. Atomic across processes for the shared backends.
+        """
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def stats(self):
+        raise NotImplementedError
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+
+class TTLCache(CacheBackend):
+    """Thread-safe LRU cache with TTL expiry and entry-count / byte-size limits"""
+
+    def __init__(self, name, max_entries=1000, max_bytes=None, ttl=None, sweep_interval=60):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (value, expires_at, size)
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._sweeper = None
+        if ttl and sweep_interval:
+            self._start_sweeper(sweep_interval)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at, _ = entry
+            if expires_at is not None and expires_at <= time.time():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = ttl if ttl is not None else self.ttl
+        size = estimate_size(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            logger.warning(f"[{self.name}] value for {key} ({size} bytes) exceeds cache size limit, not caching")
+            return
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            expires_at = time.time() + ttl if ttl else None
+            self._data[key] = (value, expires_at, size)
+            self._bytes += size
+            self._evict()
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def update(self, key, fn, ttl=None):
+        with self._lock:
+            entry = self._data.get(key)
+            current = entry[0] if entry is not None and (entry[1] is None or entry[1] > time.time()) else None
+            value, result = fn(current)
+            self.set(key, value, ttl)
+            return result
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def sweep(self):
+        """Remove all expired entries, returning how many were dropped"""
+        now = time.time()
+        with self._lock:
+            expired = [k for k, (_, exp, _) in self._data.items() if exp is not None and exp <= now]
+            for key in expired:
+                self._remove(key)
+            self.expirations += len(expired)
+        return len(expired)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _remove(self, key):
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def _evict(self):
+        while self._data and (
+            (self.max_entries is not None and len(self._data) > self.max_entries)
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            key = next(iter(self._data))
+            self._remove(key)
+            self.evictions += 1
+
+    def _start_sweeper(self, interval):
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    dropped = self.sweep()
+                    if dropped:
+                        logger.info(f"[{self.name}] swept {dropped} expired entries")
+                except Exception as e:
+                    logger.warning(f"[{self.name}] sweep failed: {str(e)}")
+
+        self._sweeper = threading.Thread(target=run, name=f"{self.name}-sweeper", daemon=True)
+        self._sweeper.start()
+
+
+class SQLiteCache(CacheBackend):
+    """Cache stored in a SQLite file so every uvicorn worker on a host shares it"""
+
+    def __init__(self, name, path, max_entries=1000, max_bytes=None, ttl=None, sweep_interval=60):
+        self.name = name
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._table = "cache_" + "".join(c for c in name if c.isalnum() or c == "_")
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self._table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL, "
+            "size INTEGER NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {self._table}_accessed ON {self._table}(accessed_at)")
+        conn.commit()
+        if ttl and sweep_interval:
+            threading.Thread(target=self._sweep_loop, args=(sweep_interval,),
+                             name=f"{name}-sweeper", daemon=True).start()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, default=None):
+        conn = self._conn()
+        row = conn.execute(f"SELECT value, expires_at FROM {self._table} WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        if row is None:
+            self.misses += 1
+            return default
+        if row[1] is not None and row[1] <= now:
+            conn.execute(f"DELETE FROM {self._table} WHERE key = ?", (key,))
+            self.expirations += 1
+            self.misses += 1
+            return default
+        conn.execute(f"UPDATE {self._table} SET accessed_at = ? WHERE key = ?", (now, key))
+        self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        ttl = ttl if ttl is not None else self.ttl
+        payload = json.dumps(value)
+        size = len(payload)
+        if self.max_bytes is not None and size > self.max_bytes:
+            logger.warning(f"[{self.name}] value for {key} ({size} bytes) exceeds cache size limit, not caching")
+            return
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            f"INSERT OR REPLACE INTO {self._table} (key, value, expires_at, size, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            (key, payload, now + ttl if ttl else None, size, now),
+        )
+        self._evict(conn)
+
+    def delete(self, key):
+        self._conn().execute(f"DELETE FROM {self._table} WHERE key = ?", (key,))
+
+    def update(self, key, fn, ttl=None):
+        ttl = ttl if ttl is not None else self.ttl
+        conn = self._conn()
+        # BEGIN IMMEDIATE takes the write lock up front, so no other process interleaves
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = conn.execute(f"SELECT value, expires_at FROM {self._table} WHERE key = ?", (key,)).fetchone()
+            current = json.loads(row[0]) if row is not None and (row[1] is None or row[1] > now) else None
+            value, result = fn(current)
+            payload = json.dumps(value)
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self._table} (key, value, expires_at, size, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, now + ttl if ttl else None, len(payload), now),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+    def clear(self):
+        self._conn().execute(f"DELETE FROM {self._table}")
+
+    def sweep(self):
+        cur = self._conn().execute(
+            f"DELETE FROM {self._table} WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+        )
+        self.expirations += cur.rowcount
+        return cur.rowcount
+
+    def stats(self):
+        entries, total = self._conn().execute(f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self._table}").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "backend": "sqlite",
+            "entries": entries,
+            "bytes": total,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def _evict(self, conn):
+        if self.max_entries is not None:
+            cur = conn.execute(
+                f"DELETE FROM {self._table} WHERE key IN (SELECT key FROM {self._table} "
+                "ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self.evictions += max(cur.rowcount, 0)
+        if self.max_bytes is not None:
+            total = conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self._table}").fetchone()[0]
+            while total > self.max_bytes:
+                row = conn.execute(f"SELECT key, size FROM {self._table} ORDER BY accessed_at LIMIT 1").fetchone()
+                if row is None:
+                    break
+                conn.execute(f"DELETE FROM {self._table} WHERE key = ?", (row[0],))
+                total -= row[1]
+                self.evictions += 1
+
+    def _sweep_loop(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                dropped = self.sweep()
+                if dropped:
+                    logger.info(f"[{self.name}] swept {dropped} expired entries")
+            except Exception as e:
+                logger.warning(f"[{self.name}] sweep failed: {str(e)}")
+
+
+class RedisCache(CacheBackend):
+    """Cache stored in Redis; any client exposing get/set/delete/scan_iter works (e.g. fakeredis)"""
+
+    def __init__(self, name, url=None, client=None, max_bytes=None, ttl=None, **_):
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise ImportError("CACHE_BACKEND=redis requires the 'redis' package")
+            client = redis.Redis.from_url(url or os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+        self.name = name
+        self.client = client
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._prefix = f"tubemate:{name}:"
+
+    def get(self, key, default=None):
+        raw = self.client.get(self._prefix + key)
+        if raw is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        ttl = ttl if ttl is not None else self.ttl
+        payload = json.dumps(value)
+        if self.max_bytes is not None and len(payload) > self.max_bytes:
+            logger.warning(f"[{self.name}] value for {key} ({len(payload)} bytes) exceeds cache size limit, not caching")
+            return
+        # Entry-count and LRU limits are delegated to the server's maxmemory-policy
+        self.client.set(self._prefix + key, payload, ex=int(ttl) if ttl else None)
+
+    def delete(self, key):
+        self.client.delete(self._prefix + key)
+
+    def update(self, key, fn, ttl=None):
+        from redis.exceptions import WatchError
+        ttl = ttl if ttl is not None else self.ttl
+        full_key = self._prefix + key
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    # Optimistic transaction: retried if another client writes the key meanwhile
+                    pipe.watch(full_key)
+                    raw = pipe.get(full_key)
+                    value, result = fn(json.loads(raw) if raw is not None else None)
+                    pipe.multi()
+                    pipe.set(full_key, json.dumps(value), ex=int(ttl) if ttl else None)
+                    pipe.execute()
+                    return result
+                except WatchError:
+                    continue
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self._prefix + "*"):
+            self.client.delete(key)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": "redis",
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+_caches = {}
+
+
+def create_cache(name, max_entries=1000, max_bytes=None, ttl=None):
+    """Build a cache using the backend selected by CACHE_BACKEND (memory, sqlite or redis)"""
+    backend = os.getenv("CACHE_BACKEND", "memory").lower()
+    if backend == "sqlite":
+        path = os.getenv("CACHE_DB_PATH", os.path.join("cache", "tubemate_cache.db"))
+        cache = SQLiteCache(name, path, max_entries=max_entries, max_bytes=max_bytes, ttl=ttl)
+    elif backend == "redis":
+        cache = RedisCache(name, url=os.getenv("REDIS_URL"), max_bytes=max_bytes, ttl=ttl)
+    else:
+        if backend != "memory":
+            logger.warning(f"Unknown CACHE_BACKEND '{backend}', falling back to in-process memory cache")
+        cache = TTLCache(name, max_entries=max_entries, max_bytes=max_bytes, ttl=ttl)
+    _caches[name] = cache
+    return cache
+
+
+def registered_caches():
+    """Every cache created in this process, by name (used for metrics)"""
+    return dict(_caches)
+
+
+_MISSING = object()
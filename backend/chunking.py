@@ -0,0 +1,156 @@
+import re
+from collections import deque
+from bisect import bisect_right
+from langchain_core.documents import Document
+from timed_transcript import TimedTranscript
+
+# Same clean-up rules as before, compiled once; each runs on one caption segment at a time
+_NOTES = re.compile(r'\[.*?\]|\(.*?\)')
+_WHITESPACE = re.compile(r'\s+')
+_JOINED_SENTENCES = re.compile(r'(\w)\.(\w)')
+_REPEATED_PUNCTUATION = re.compile(r'([.!?]){2,}')
+
+_SENTENCE_BREAKS = (". ", "! ", "? ")
+_CLAUSE_BREAKS = ("; ", ", ")
+
+# Untimed text is cleaned and chunked in windows of about this many characters
+PIECE_CHARS = 2000
+
+
+def clean_text(text):
+    text = _NOTES.sub('', text)
+    text = _WHITESPACE.sub(' ', text)
+    text = _JOINED_SENTENCES.sub(r'\1. \2', text)
+    text = _REPEATED_PUNCTUATION.sub(r'\1', text)
+    return text.strip()
+
+
+def _split_untimed(text, size=PIECE_CHARS):
+    """Yield consecutive slices of `text` of about `size` chars, cut just before a space"""
+    start = 0
+    while start < len(text):
+        end = text.find(" ", start + size)
+        if end == -1:
+            end = len(text)
+        yield text[start:end]
+        start = end
+
+
+def transcript_pieces(transcript):
+    """
+    (start_time, text) pieces whose concatenation is exactly `transcript`, so chunk offsets
+    index into it; start_time is None for untimed text.
+    """
+    if isinstance(transcript, TimedTranscript) and transcript.has_timestamps:
+        if transcript.offsets[0] > 0:
+            yield None, str.__getitem__(transcript, slice(0, transcript.offsets[0]))
+        yield from transcript.segments()
+    else:
+        for piece in _split_untimed(str(transcript)):
+            yield None, piece
+
+
+def clean_pieces(transcript, segments_out):
+    """
+    Clean a transcript segment by segment, yielding (start_time, text) pieces of the cleaned
+    transcript (joining spaces included) as they are produced. Cleaned segments are appended
+    to `segments_out` so the caller can assemble the cleaned TimedTranscript afterwards.
+    """
+    timed = isinstance(transcript, TimedTranscript) and transcript.has_timestamps
+    source = transcript.segments() if timed else ((None, piece) for piece in _split_untimed(str(transcript)))
+    first = True
+    for start, text in source:
+        text = clean_text(text)
+        if not text:
+            continue
+        segments_out.append({"text": text, "start": start})
+        yield (start if timed else None), text if first else " " + text
+        first = False
+
+
+def assemble_cleaned(segments, timed):
+    if timed:
+        return TimedTranscript.from_segments(segments)
+    return " ".join(segment["text"] for segment in segments)
+
+
+def clean_transcript(text):
+    """Clean a transcript segment by segment so every segment keeps its start time"""
+    segments = []
+    for _ in clean_pieces(text, segments):
+        pass
+    return assemble_cleaned(segments, isinstance(text, TimedTranscript) and text.has_timestamps)
+
+
+def chunk_sizes(length):
+    """(chunk_size, chunk_overlap) for a transcript of `length` chars"""
+    return (1200, 200) if length > 20000 else (800, 150)
+
+
+def _find_cut(buffer, size):
+    """Where to end a chunk: the last sentence break, else clause break, else space, in its second half"""
+    for breaks in (_SENTENCE_BREAKS, _CLAUSE_BREAKS, (" ",)):
+        cut = max(buffer.rfind(b, size // 2, size) for b in breaks)
+        if cut != -1:
+            return cut + 1
+    return size
+
+
+def _overlap_start(buffer, cut, overlap):
+    """Start of the next chunk: `overlap` chars before the cut, moved forward to a word start"""
+    space = buffer.find(" ", max(1, cut - overlap), cut)
+    return space + 1 if space != -1 else cut
+
+
+def iter_chunks(pieces, chunk_size=800, chunk_overlap=150):
+    """
+    Chunk a stream of (start_time, text) pieces in one pass, yielding Documents as soon as
+    enough text has arrived. Only the text of the chunk being built is held, so memory stays
+    bounded however long the transcript is. Metadata: start_index (offset into the
+    concatenated pieces), position and, for timed pieces, start_time and end_time.
+    """
+    buffer = ""
+    buffer_start = 0
+    consumed = 0
+    times = deque()  # (offset, start_time) of the pieces overlapping the buffer
+    position = 0
+    emitted_end = 0
+
+    def time_at(offset):
+        if not times:
+            return None
+        offsets = [o for o, _ in times]
+        return times[max(0, bisect_right(offsets, offset) - 1)][1]
+
+    def make_chunk(raw):
+        nonlocal position
+        content = raw.strip()
+        start_index = buffer_start + len(raw) - len(raw.lstrip())
+        metadata = {"start_index": start_index, "position": position}
+        if times:
+            metadata["start_time"] = time_at(start_index)
+            metadata["end_time"] = time_at(start_index + len(content))
+        position += 1
+        return Document(page_content=content, metadata=metadata)
+
+    for start_time, text in pieces:
+        if start_time is not None:
+            # A leading joining space belongs to the previous segment, as in TimedTranscript
+            times.append((consumed + len(text) - len(text.lstrip(" ")), start_time))
+        buffer += text
+        consumed += len(text)
+
+        while len(buffer) > chunk_size:
+            cut = _find_cut(buffer, chunk_size)
+            if buffer[:cut].strip():
+                yield make_chunk(buffer[:cut])
+                emitted_end = buffer_start + cut
+            next_start = _overlap_start(buffer, cut, chunk_overlap)
+            buffer = buffer[next_start:]
+            buffer_start += next_start
+            while len(times) > 1 and times[1][0] <= buffer_start:
+                times.popleft()
+
+    # What's left is either new text or only the overlap of the last chunk
+    if buffer_start + len(buffer.rstrip()) > emitted_end and buffer.strip():
+        yield make_chunk(buffer)
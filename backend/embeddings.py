@@ -0,0 +1,211 @@
+import os
+import hashlib
+import logging
+import sqlite3
+import tempfile
+import threading
+from collections import OrderedDict
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class VectorCache:
+    """
+    Content-hash -> float32 vector store. Vectors live in one append-only file read through
+    np.memmap; a SQLite table maps each hash to its row. Row allocation happens inside a
+    write transaction, so several processes can share the same directory.
+    """
+
+    def __init__(self, directory, dim):
+        self.directory = directory
+        self.dim = dim
+        os.makedirs(directory, exist_ok=True)
+        self.vectors_path = os.path.join(directory, f"vectors_{dim}.f32")
+        self._index_path = os.path.join(directory, f"index_{dim}.sqlite")
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._map = None
+        self._mapped_rows = 0
+        open(self.vectors_path, "ab").close()
+        self._conn().execute("CREATE TABLE IF NOT EXISTS vectors (key TEXT PRIMARY KEY, row INTEGER NOT NULL)")
+        self.hits = 0
+        self.misses = 0
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._index_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _rows(self, needed_row):
+        """Memory map covering at least `needed_row`, remapped when the file has grown"""
+        with self._lock:
+            if self._map is None or needed_row >= self._mapped_rows:
+                rows = os.path.getsize(self.vectors_path) // (self.dim * 4)
+                self._map = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim)) if rows else None
+                self._mapped_rows = rows
+            return self._map
+
+    def get_many(self, keys):
+        """Return {key: vector} for the keys that are cached"""
+        found = {}
+        conn = self._conn()
+        for i in range(0, len(keys), 500):
+            batch = keys[i:i + 500]
+            placeholders = ",".join("?" * len(batch))
+            for key, row in conn.execute(f"SELECT key, row FROM vectors WHERE key IN ({placeholders})", batch):
+                found[key] = row
+        if not found:
+            self.misses += len(keys)
+            return {}
+        vectors = self._rows(max(found.values()))
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return {key: np.array(vectors[row]) for key, row in found.items()}
+
+    def put_many(self, items):
+        """Append (key, vector) pairs that aren't stored yet"""
+        if not items:
+            return
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            next_row = conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM vectors").fetchone()[0]
+            fd = os.open(self.vectors_path, os.O_WRONLY)
+            try:
+                for key, vector in items:
+                    if conn.execute("SELECT 1 FROM vectors WHERE key = ?", (key,)).fetchone():
+                        continue
+                    data = np.asarray(vector, dtype=np.float32).tobytes()
+                    # Vector bytes land before the row is committed, so readers never see a missing vector
+                    os.pwrite(fd, data, next_row * self.dim * 4)
+                    conn.execute("INSERT INTO vectors (key, row) VALUES (?, ?)", (key, next_row))
+                    next_row += 1
+            finally:
+                os.close(fd)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def stats(self):
+        rows = self._conn().execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+        return {"vectors": rows, "dim": self.dim, "hits": self.hits, "misses": self.misses}
+
+
+class EmbeddingService(Embeddings):
+    """
+    Sentence-transformer embeddings with configurable batch size, torch thread count and
+    backend ("torch", or "onnx" via optimum), backed by a content-hash vector cache so the
+    same chunk or question is never embedded twice.
+    """
+
+    def __init__(self, model_name, batch_size=64, torch_threads=None, backend="torch", cache_dir=None, query_cache_size=1024):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.torch_threads = torch_threads
+        self.backend = backend
+        self.cache_dir = cache_dir
+        self._model = None
+        self._cache = None
+        self._queries = OrderedDict()
+        self._query_cache_size = query_cache_size
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._load_model()
+        return self._model
+
+    def _load_model(self):
+        from langchain_huggingface import HuggingFaceEmbeddings
+
+        if self.torch_threads:
+            import torch
+            torch.set_num_threads(self.torch_threads)
+
+        encode_kwargs = {"batch_size": self.batch_size}
+        if self.backend == "onnx":
+            try:
+                return HuggingFaceEmbeddings(model_name=self.model_name, model_kwargs={"backend": "onnx"}, encode_kwargs=encode_kwargs)
+            except Exception as e:
+                logger.warning(f"ONNX embedding backend unavailable ({str(e)}), falling back to torch")
+                self.backend = "torch"
+        return HuggingFaceEmbeddings(model_name=self.model_name, encode_kwargs=encode_kwargs)
+
+    def _vector_cache(self, dim=None):
+        """Open the on-disk cache; the vector size is remembered so a fresh process can read it before loading the model"""
+        if self._cache is None and self.cache_dir:
+            directory = os.path.join(self.cache_dir, hashlib.sha1(f"{self.model_name}:{self.backend}".encode("utf-8")).hexdigest()[:12])
+            dim_path = os.path.join(directory, "dim")
+            if dim is None and os.path.exists(dim_path):
+                with open(dim_path) as f:
+                    dim = int(f.read().strip())
+            if dim is None:
+                return None
+            os.makedirs(directory, exist_ok=True)
+            with open(dim_path, "w") as f:
+                f.write(str(dim))
+            self._cache = VectorCache(directory, dim)
+        return self._cache
+
+    def _key(self, text):
+        return hashlib.sha1(f"{self.model_name}:{self.backend}:{text}".encode("utf-8")).hexdigest()
+
+    def embed_documents(self, texts):
+        keys = [self._key(text) for text in texts]
+        cache = self._vector_cache()
+        cached = cache.get_many(keys) if cache else {}
+
+        # One index per distinct missing text, so repeated chunks are embedded once
+        missing = list({key: i for i, key in enumerate(keys) if key not in cached}.values())
+        if missing:
+            logger.info(f"Embedding {len(missing)}/{len(texts)} chunks ({len(cached)} distinct cached)")
+            fresh = self.model.embed_documents([texts[i] for i in missing])
+            cache = self._vector_cache(len(fresh[0]))
+            if cache:
+                cache.put_many([(keys[i], vector) for i, vector in zip(missing, fresh)])
+            for i, vector in zip(missing, fresh):
+                cached[keys[i]] = vector
+
+        return [list(map(float, cached[key])) for key in keys]
+
+    def embed_query(self, text):
+        key = self._key("query:" + text)
+        with self._lock:
+            if key in self._queries:
+                self._queries.move_to_end(key)
+                return self._queries[key]
+        vector = self.model.embed_query(text)
+        with self._lock:
+            self._queries[key] = vector
+            while len(self._queries) > self._query_cache_size:
+                self._queries.popitem(last=False)
+        return vector
+
+    def stats(self):
+        stats = {"model": self.model_name, "backend": self.backend, "batch_size": self.batch_size,
+                 "loaded": self._model is not None, "cached_queries": len(self._queries)}
+        if self._cache:
+            stats["vector_cache"] = self._cache.stats()
+        return stats
+
+
+def create_embedding_service(model_name):
+    """EmbeddingService configured from EMBEDDING_* environment variables"""
+    threads = os.getenv("EMBEDDING_THREADS")
+    return EmbeddingService(
+        model_name,
+        batch_size=int(os.getenv("EMBEDDING_BATCH_SIZE", "64")),
+        torch_threads=int(threads) if threads else None,
+        backend=os.getenv("EMBEDDING_BACKEND", "torch").lower(),
+        cache_dir=os.getenv("EMBEDDING_CACHE_DIR", os.path.join(tempfile.gettempdir(), "tubemate", "embeddings")),
+    )
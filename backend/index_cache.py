@@ -0,0 +1,257 @@
+import os
+import json
+import stat
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from langchain_core.documents import Document
+from langchain_community.vectorstores import FAISS
+from lexical_index import BM25Index
+from metrics import CACHE_LOOKUPS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def config_hash(config):
+    """Stable short hash of a pipeline configuration dict"""
+    payload = json.dumps(config, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+
+def transcript_fingerprint(text):
+    """Content hash used when a transcript has no video id attached"""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def private_dir(path):
+    """
+    Create `path` readable by this user only. Index directories hold pickles that are loaded
+    with allow_dangerous_deserialization, so refuse a directory, or a parent, that another
+    user owns or can write to.
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    os.chmod(path, 0o700)
+    for directory in (path, os.path.dirname(os.path.abspath(path))):
+        st = os.stat(directory)
+        others_can_write = st.st_mode & 0o002 and not st.st_mode & stat.S_ISVTX
+        if st.st_uid not in (os.getuid(), 0) or others_can_write:
+            raise PermissionError(f"{directory} can be modified by other users")
+    return path
+
+
+def save_index_dir(path, vector_store, meta):
+    """
+    Persist a FAISS store and its meta.json. Writes into a sibling temp dir and swaps it in
+    so readers never see a half-written index.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = tempfile.mkdtemp(dir=os.path.dirname(path))
+    try:
+        vector_store.save_local(tmp_path)
+        with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+    except Exception:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+
+def load_index_dir(path, embedding, label, build):
+    """
+    Load a directory written by save_index_dir and return build(vector_store, meta, chunks),
+    or None if there is none. Unreadable directories are discarded.
+    """
+    meta_path = os.path.join(path, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        # The pickle in the index directory was written by this process family
+        vector_store = FAISS.load_local(path, embedding, allow_dangerous_deserialization=True)
+        chunks = [Document(page_content=c["page_content"], metadata=c["metadata"]) for c in meta["chunks"]]
+        loaded = build(vector_store, meta, chunks)
+        logger.info(f"Loaded {label} from disk")
+        return loaded
+    except Exception as e:
+        logger.warning(f"Discarding unreadable {label}: {str(e)}")
+        shutil.rmtree(path, ignore_errors=True)
+        return None
+
+
+class VideoArtifacts:
+    """Everything process_youtube_video derives from a transcript before retrieval"""
+
+    def __init__(self, processed_transcript, chunks, vector_store, is_long_transcript, lexical_index=None):
+        self.processed_transcript = processed_transcript
+        self.chunks = chunks
+        self.vector_store = vector_store
+        self.is_long_transcript = is_long_transcript
+        self.lexical_index = lexical_index
+        self._fingerprint = None
+
+    @property
+    def fingerprint(self):
+        """Hash of the processed transcript, used to invalidate answers derived from it"""
+        if self._fingerprint is None:
+            self._fingerprint = transcript_fingerprint(self.processed_transcript)
+        return self._fingerprint
+
+
+class VideoIndexCache:
+    """
+    Two-tier (memory LRU + on-disk FAISS) cache of per-video artifacts. The disk tier drops
+    indexes unused for `max_disk_age` seconds, then the least recently used ones until it
+    fits in `max_disk_bytes`. It is disabled if `cache_dir` can't be made private.
+    """
+
+    def __init__(self, cache_dir, max_memory_items=16, max_disk_bytes=None, max_disk_age=None, prune_interval=60):
+        self.max_memory_items = max_memory_items
+        self.max_disk_bytes = max_disk_bytes
+        self.max_disk_age = max_disk_age
+        self.prune_interval = prune_interval
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+        try:
+            self.cache_dir = private_dir(cache_dir)
+        except OSError as e:
+            logger.warning(f"Index disk cache disabled: {str(e)}")
+            self.cache_dir = None
+
+    def _key(self, video_id, pipeline_hash):
+        return f"{video_id}:{pipeline_hash}"
+
+    def _path(self, video_id, pipeline_hash):
+        safe_id = "".join(c for c in video_id if c.isalnum() or c in "-_")
+        return os.path.join(self.cache_dir, safe_id, pipeline_hash)
+
+    def get(self, video_id, pipeline_hash, embedding):
+        """Return cached artifacts from memory, then disk, or None"""
+        key = self._key(video_id, pipeline_hash)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                CACHE_LOOKUPS.inc(cache="video_index", result="memory_hit")
+                return self._memory[key]
+
+        artifacts = self._load(video_id, pipeline_hash, embedding)
+        if artifacts is not None:
+            self._remember(key, artifacts)
+        CACHE_LOOKUPS.inc(cache="video_index", result="disk_hit" if artifacts is not None else "miss")
+        return artifacts
+
+    def put(self, video_id, pipeline_hash, artifacts):
+        """Store artifacts in memory and persist them to disk"""
+        self._remember(self._key(video_id, pipeline_hash), artifacts)
+        if self.cache_dir is None:
+            return
+        try:
+            self._save(video_id, pipeline_hash, artifacts)
+        except Exception as e:
+            logger.warning(f"Could not persist index for video {video_id}: {str(e)}")
+        if time.time() - self._last_prune >= self.prune_interval:
+            self._last_prune = time.time()
+            try:
+                self.prune()
+            except OSError as e:
+                logger.warning(f"Could not prune the index disk cache: {str(e)}")
+
+    def invalidate(self, video_id):
+        """Drop every cached artifact for a video"""
+        with self._lock:
+            for key in [k for k in self._memory if k.startswith(f"{video_id}:")]:
+                del self._memory[key]
+        if self.cache_dir is not None:
+            shutil.rmtree(os.path.dirname(self._path(video_id, "x")), ignore_errors=True)
+
+    def prune(self):
+        """Apply the disk tier's age and size caps; last use is the mtime of each meta.json"""
+        entries = []
+        for video_dir in os.scandir(self.cache_dir):
+            if not video_dir.is_dir():
+                continue
+            for index_dir in os.scandir(video_dir.path):
+                try:
+                    used_at = os.stat(os.path.join(index_dir.path, "meta.json")).st_mtime
+                    size = sum(f.stat().st_size for f in os.scandir(index_dir.path) if f.is_file())
+                except OSError:
+                    continue
+                entries.append((used_at, size, index_dir.path))
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        now = time.time()
+        removed = 0
+        for used_at, size, path in entries:
+            too_old = self.max_disk_age is not None and now - used_at > self.max_disk_age
+            too_big = self.max_disk_bytes is not None and total > self.max_disk_bytes
+            if not (too_old or too_big):
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            try:
+                os.rmdir(os.path.dirname(path))
+            except OSError:
+                pass
+            total -= size
+            removed += 1
+        if removed:
+            logger.info(f"Pruned {removed} cached indexes from disk, {total} bytes left")
+
+    def _remember(self, key, artifacts):
+        with self._lock:
+            self._memory[key] = artifacts
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_items:
+                self._memory.popitem(last=False)
+
+    def _save(self, video_id, pipeline_hash, artifacts):
+        meta = {
+            "processed_transcript": artifacts.processed_transcript,
+            "is_long_transcript": artifacts.is_long_transcript,
+            "chunks": [
+                {"page_content": c.page_content, "metadata": c.metadata}
+                for c in artifacts.chunks
+            ],
+            "lexical_index": artifacts.lexical_index.to_dict() if artifacts.lexical_index else None,
+        }
+        save_index_dir(self._path(video_id, pipeline_hash), artifacts.vector_store, meta)
+
+    def _load(self, video_id, pipeline_hash, embedding):
+        if self.cache_dir is None:
+            return None
+
+        def build(vector_store, meta, chunks):
+            lexical_index = BM25Index.from_dict(meta["lexical_index"]) if meta.get("lexical_index") else None
+            return VideoArtifacts(meta["processed_transcript"], chunks, vector_store, meta["is_long_transcript"], lexical_index)
+
+        path = self._path(video_id, pipeline_hash)
+        artifacts = load_index_dir(path, embedding, f"cached index for video {video_id}", build)
+        if artifacts is not None:
+            # Mark it recently used for prune()
+            try:
+                os.utime(os.path.join(path, "meta.json"))
+            except OSError:
+                pass
+        return artifacts
+
+
+_index_cache = None
+
+
+def get_index_cache():
+    """Get the process-wide index cache"""
+    global _index_cache
+    if _index_cache is None:
+        cache_dir = os.getenv("INDEX_CACHE_DIR", os.path.join(tempfile.gettempdir(), "tubemate", "indexes"))
+        max_items = int(os.getenv("INDEX_CACHE_MEMORY_ITEMS", "16"))
+        max_bytes = int(os.getenv("INDEX_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+        max_age = int(os.getenv("INDEX_CACHE_MAX_AGE", str(7 * 24 * 3600)))
+        _index_cache = VideoIndexCache(cache_dir, max_items, max_bytes, max_age)
+    return _index_cache
@@ -0,0 +1,172 @@
+import os
+import time
+import uuid
+import hashlib
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from cache import create_cache
+from metrics import STAGE_SECONDS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobQueueFull(Exception):
+    """Raised when too many jobs are already waiting"""
+
+
+class JobManager:
+    """
+    Runs long-video jobs on a bounded worker pool and tracks their state in a shared cache.
+    The owning process refreshes `updated_at` on its queued and running jobs every
+    `heartbeat_interval`; a record that hasn't been refreshed for `stale_after` belongs to a
+    worker that died or restarted, and counts as failed.
+    """
+
+    def __init__(self, max_workers=2, max_queued=100, use_processes=True, job_ttl=3600,
+                 heartbeat_interval=15, stale_after=60):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.job_ttl = job_ttl
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+        self.jobs = create_cache("jobs", max_entries=10000, ttl=job_ttl)
+        # Dispatcher threads own the job lifecycle; the heavy call itself runs in the process pool
+        self._dispatcher = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job-dispatch")
+        self._pool = None
+        if use_processes:
+            self._pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+        self._pending = 0
+        self._lock = threading.Lock()
+        # Jobs this process owns that haven't finished; writes of their records hold _state_lock
+        self._active = {}
+        self._state_lock = threading.Lock()
+        self._stopped = threading.Event()
+        threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True).start()
+
+    def _dedup_key(self, key):
+        return "key:" + hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def submit(self, key, fn, *args, on_complete=None):
+        """
+        Queue fn(*args) unless an identical job is already queued, running or finished. fn must
+        raise on failure: only jobs that returned are DONE and reused; FAILED ones, including
+        jobs whose worker went away, are re-run.
+        """
+        with self._lock:
+            existing_id = self.jobs.get(self._dedup_key(key))
+            if existing_id:
+                existing = self.get(existing_id)
+                if existing and existing["status"] != FAILED:
+                    logger.info(f"Reusing job {existing_id} for {key}")
+                    return existing
+
+            if self._pending >= self.max_queued:
+                raise JobQueueFull(f"{self._pending} jobs already waiting")
+
+            job_id = uuid.uuid4().hex
+            now = time.time()
+            job = {
+                "job_id": job_id,
+                "status": QUEUED,
+                "owner": os.getpid(),
+                "created_at": now,
+                "updated_at": now,
+                "started_at": None,
+                "finished_at": None,
+                "result": None,
+                "error": None,
+            }
+            with self._state_lock:
+                self._active[job_id] = job
+                self.jobs.set("job:" + job_id, job)
+            self.jobs.set(self._dedup_key(key), job_id)
+            self._pending += 1
+
+        self._dispatcher.submit(self._run, job, fn, args, on_complete)
+        return job
+
+    def get(self, job_id):
+        """The job record; a queued or running one whose owner stopped heartbeating is FAILED"""
+        job = self.jobs.get("job:" + job_id)
+        if job and job["status"] in (QUEUED, RUNNING) and time.time() - job.get("updated_at", job["created_at"]) > self.stale_after:
+            logger.warning(f"Job {job_id} of process {job.get('owner')} stopped heartbeating, marking it failed")
+            job.update(status=FAILED, error="The worker running this job stopped, please ask again", finished_at=time.time())
+            self.jobs.set("job:" + job_id, job)
+        return job
+
+    def _save(self, job, finished=False):
+        with self._state_lock:
+            job["updated_at"] = time.time()
+            self.jobs.set("job:" + job["job_id"], job)
+            if finished:
+                self._active.pop(job["job_id"], None)
+
+    def _heartbeat(self):
+        while not self._stopped.wait(self.heartbeat_interval):
+            with self._state_lock:
+                jobs = list(self._active.values())
+            for job in jobs:
+                try:
+                    with self._state_lock:
+                        if job["job_id"] in self._active:
+                            job["updated_at"] = time.time()
+                            self.jobs.set("job:" + job["job_id"], job)
+                except Exception as e:
+                    logger.warning(f"Could not refresh job {job['job_id']}: {str(e)}")
+
+    def stats(self):
+        return {"pending": self._pending, "max_workers": self.max_workers, "max_queued": self.max_queued}
+
+    def _run(self, job, fn, args, on_complete):
+        job_id = job["job_id"]
+        job.update(status=RUNNING, started_at=time.time())
+        STAGE_SECONDS.observe(job["started_at"] - job["created_at"], stage="job_queue_wait")
+        self._save(job)
+        try:
+            if self._pool is not None:
+                result = self._pool.submit(fn, *args).result()
+            else:
+                result = fn(*args)
+            job.update(status=DONE, result=result)
+            if on_complete:
+                on_complete(result)
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {str(e)}", exc_info=True)
+            job.update(status=FAILED, error=str(e))
+        finally:
+            job["finished_at"] = time.time()
+            # Stage timings inside the process pool stay in the worker; the parent records the whole job
+            STAGE_SECONDS.observe(job["finished_at"] - job["started_at"], stage="job")
+            self._save(job, finished=True)
+            with self._lock:
+                self._pending -= 1
+        logger.info(f"Job {job_id} {job['status']} in {job['finished_at'] - job['started_at']:.2f} seconds")
+
+    def shutdown(self):
+        self._stopped.set()
+        self._dispatcher.shutdown(wait=False, cancel_futures=True)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_job_manager = None
+
+
+def get_job_manager():
+    """Get the process-wide job manager, configured from JOB_WORKERS / JOB_MAX_QUEUED / JOB_EXECUTOR"""
+    global _job_manager
+    if _job_manager is None:
+        _job_manager = JobManager(
+            max_workers=int(os.getenv("JOB_WORKERS", "2")),
+            max_queued=int(os.getenv("JOB_MAX_QUEUED", "100")),
+            use_processes=os.getenv("JOB_EXECUTOR", "process").lower() == "process",
+        )
+    return _job_manager
@@ -0,0 +1,90 @@
+import re
+import math
+from collections import Counter, defaultdict
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text, stopwords=frozenset()):
+    """Lowercased word tokens without stopwords; numbers are kept since they're often what a question is about"""
+    return [
+        token for token in TOKEN_PATTERN.findall(text.lower())
+        if token not in stopwords and (len(token) > 1 or token.isdigit())
+    ]
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a video's chunks, stored as an inverted index (term -> [(chunk, tf)]).
+    Built once next to the FAISS index and persisted with it as plain JSON.
+    """
+
+    def __init__(self, postings, doc_lengths, stopwords=frozenset(), k1=1.5, b=0.75):
+        self.postings = postings
+        self.doc_lengths = doc_lengths
+        self.stopwords = frozenset(stopwords)
+        self.k1 = k1
+        self.b = b
+        self.avg_length = (sum(doc_lengths) / len(doc_lengths)) if doc_lengths else 0.0
+
+    @classmethod
+    def from_texts(cls, texts, stopwords=frozenset(), k1=1.5, b=0.75):
+        postings = defaultdict(list)
+        doc_lengths = []
+        for doc, text in enumerate(texts):
+            tokens = tokenize(text, stopwords)
+            doc_lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                postings[term].append((doc, tf))
+        return cls(dict(postings), doc_lengths, stopwords, k1, b)
+
+    def extend(self, other):
+        """Append another index's documents after this one's, renumbering their chunk ids"""
+        offset = len(self.doc_lengths)
+        for term, plist in other.postings.items():
+            self.postings.setdefault(term, []).extend((doc + offset, tf) for doc, tf in plist)
+        self.doc_lengths.extend(other.doc_lengths)
+        self.avg_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if self.doc_lengths else 0.0
+
+    def idf(self, term):
+        df = len(self.postings.get(term, ()))
+        n = len(self.doc_lengths)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, query, k=10, allowed=None):
+        """Top-k (chunk, score) pairs for a query, optionally restricted to a set of chunk ids"""
+        scores = defaultdict(float)
+        for term in set(tokenize(query, self.stopwords)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf(term)
+            for doc, tf in postings:
+                if allowed is not None and doc not in allowed:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc] / (self.avg_length or 1.0))
+                scores[doc] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def to_dict(self):
+        return {
+            "postings": self.postings,
+            "doc_lengths": self.doc_lengths,
+            "stopwords": sorted(self.stopwords),
+            "k1": self.k1,
+            "b": self.b,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        postings = {term: [tuple(p) for p in plist] for term, plist in data["postings"].items()}
+        return cls(postings, data["doc_lengths"], data.get("stopwords", ()), data["k1"], data["b"])
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """Fuse several ranked id lists into {id: score} using reciprocal rank fusion"""
+    fused = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            fused[doc] += 1.0 / (k + rank + 1)
+    return dict(fused)
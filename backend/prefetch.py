@@ -0,0 +1,155 @@
+"""Warm transcripts and per-video indexes ahead of the first question.
+
+Usage:
+    python prefetch.py VIDEO_ID [VIDEO_ID ...] [--file ids.txt] [--concurrency 4]
+"""
+
+import os
+import sys
+import time
+import uuid
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from cache import create_cache
+from transcript_helper import get_transcript, get_cached_transcript, cache_transcript, is_transcript_error
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MAX_PREFETCH_VIDEOS = 200
+
+_runs = None
+
+
+def get_prefetch_runs():
+    """Progress records for prefetch runs, shared between workers through the cache backend"""
+    global _runs
+    if _runs is None:
+        _runs = create_cache("prefetch_runs", max_entries=1000, ttl=24 * 3600)
+    return _runs
+
+
+def load_video_artifacts(video_id):
+    """Fetch (or reuse) a transcript and build its persisted index. Returns (artifacts, None) or (None, reason)"""
+    # Imported lazily so the CLI can print usage without loading the embedding model
+    from yt_chat_rag_using_langchain import get_video_artifacts
+
+    transcript = get_cached_transcript(video_id)
+    if transcript is None:
+        transcript = get_transcript(video_id)
+        if is_transcript_error(transcript):
+            return None, transcript
+        cache_transcript(video_id, transcript)
+
+    return get_video_artifacts(transcript, video_id), None
+
+
+def prefetch_video(video_id):
+    """Warm one video's transcript and index. Returns a failure reason or None"""
+    _, reason = load_video_artifacts(video_id)
+    return reason
+
+
+def prefetch_videos(video_ids, concurrency=4, progress=None):
+    """
+    Prefetch videos with bounded concurrency. `progress(video_id, status, reason)` is called
+    as each video finishes. Returns {"succeeded": [...], "failed": {video_id: reason}}.
+    """
+    video_ids = list(dict.fromkeys(video_ids))
+    succeeded, failed = [], {}
+
+    def run(video_id):
+        try:
+            return prefetch_video(video_id)
+        except Exception as e:
+            logger.error(f"Prefetch failed for {video_id}: {str(e)}", exc_info=True)
+            return f"Error: {str(e)}"
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="prefetch") as pool:
+        futures = {pool.submit(run, video_id): video_id for video_id in video_ids}
+        for future in as_completed(futures):
+            video_id = futures[future]
+            reason = future.result()
+            if reason is None:
+                succeeded.append(video_id)
+            else:
+                failed[video_id] = reason
+            if progress:
+                progress(video_id, "done" if reason is None else "failed", reason)
+
+    return {"succeeded": succeeded, "failed": failed}
+
+
+def start_prefetch_run(video_ids, concurrency=4):
+    """Start a prefetch in a background thread and return its run record"""
+    runs = get_prefetch_runs()
+    video_ids = list(dict.fromkeys(video_ids))
+    run = {
+        "prefetch_id": uuid.uuid4().hex,
+        "status": "running",
+        "total": len(video_ids),
+        "completed": 0,
+        "videos": {video_id: "queued" for video_id in video_ids},
+        "failed": {},
+        "started_at": time.time(),
+        "finished_at": None,
+    }
+    runs.set(run["prefetch_id"], run)
+    lock = threading.Lock()
+
+    def progress(video_id, status, reason):
+        with lock:
+            run["completed"] += 1
+            run["videos"][video_id] = status
+            if reason:
+                run["failed"][video_id] = reason
+            runs.set(run["prefetch_id"], run)
+
+    def worker():
+        try:
+            prefetch_videos(video_ids, concurrency, progress)
+            run["status"] = "done"
+        except Exception as e:
+            logger.error(f"Prefetch run {run['prefetch_id']} crashed: {str(e)}", exc_info=True)
+            run["status"] = "failed"
+        run["finished_at"] = time.time()
+        runs.set(run["prefetch_id"], run)
+
+    threading.Thread(target=worker, name=f"prefetch-{run['prefetch_id'][:8]}", daemon=True).start()
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video_ids", nargs="*")
+    parser.add_argument("--file", help="file with one video id per line")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("PREFETCH_CONCURRENCY", "4")))
+    args = parser.parse_args()
+
+    video_ids = list(args.video_ids)
+    if args.file:
+        with open(args.file) as f:
+            video_ids.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+    if not video_ids:
+        parser.error("no video ids given")
+
+    total = len(set(video_ids))
+    done = [0]
+
+    def progress(video_id, status, reason):
+        done[0] += 1
+        suffix = f" ({reason})" if reason else ""
+        print(f"[{done[0]}/{total}] {video_id}: {status}{suffix}", flush=True)
+
+    start = time.time()
+    result = prefetch_videos(video_ids, args.concurrency, progress)
+    print(f"Prefetched {len(result['succeeded'])}/{total} videos in {time.time() - start:.1f}s")
+    for video_id, reason in result["failed"].items():
+        print(f"  FAILED {video_id}: {reason}")
+    sys.exit(1 if result["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,84 +1,175 @@
 import time
+import asyncio
 import os
 from dotenv import load_dotenv
 
 
 load_dotenv()
-api_key = os.getenv('GROQ_API_KEY')
-if not api_key:
-    raise ValueError("GROQ_API_KEY not found in environment variables")
-print(f"API key loaded: {api_key[:8]}...")
-from langchain_groq import ChatGroq
-from langchain.callbacks.manager import CallbackManager
-from langchain.callbacks.streaming_stdout import StreamingStdOutCallbackHandler
 import logging
+import random
+import threading
+from rate_limiter import RateLimiter, INTERACTIVE, estimate_tokens, retry_after_from_error, jittered_backoff
+from metrics import LLM_CALLS, LLM_TOKENS
+from cache import create_cache
+
+DEFAULT_MODEL_NAME = "llama3-70b-8192"
+
+# Completion tokens budgeted for a call when the caller doesn't cap max_tokens
+DEFAULT_COMPLETION_TOKENS = 512
 
 class RateLimitedLLM:
     """A wrapper around LLM calls that handles rate limiting"""
     
-    def __init__(self, model_name="llama3-70b-8192", retry_limit=5, base_wait_time=5):
+    def __init__(self, model_name=DEFAULT_MODEL_NAME, retry_limit=5, base_wait_time=5, limiter=None):
         self.model_name = model_name
         self.retry_limit = retry_limit
         self.base_wait_time = base_wait_time
-        self.last_call_time = 0
-        self.min_time_between_calls = 1.0  # Minimum 1 second between calls
+        # One Groq account, so the budget is kept in the shared cache backend for every process
+        self.limiter = limiter or RateLimiter(
+            requests_per_minute=int(os.getenv("GROQ_RPM", "30")),
+            tokens_per_minute=int(os.getenv("GROQ_TPM", "6000")),
+            state=create_cache("llm_rate_limit", max_entries=10)
+        )
         self.llm = self._create_llm()
         self.logger = logging.getLogger(__name__)
     
     def _create_llm(self):
         """Create the LLM with appropriate settings"""
+        api_key = os.getenv('GROQ_API_KEY')
+        if not api_key:
+            raise ValueError("GROQ_API_KEY not found in environment variables")
+        print(f"API key loaded: {api_key[:8]}...")
+        # Imported here so importing this module stays cheap until the first LLM call
+        from langchain_groq import ChatGroq
         return ChatGroq(
             model=self.model_name,
             temperature=0.1,  
-            streaming=True,
-            callback_manager=CallbackManager([StreamingStdOutCallbackHandler()])
+            streaming=True
         )
     
-    def invoke(self, prompt, max_tokens=None):
-        """Invoke the LLM with rate limiting and retries"""
-        # Ensure we don't call too frequently
-        current_time = time.time()
-        time_since_last_call = current_time - self.last_call_time
+    def _budget(self, prompt, max_tokens):
+        text = prompt if isinstance(prompt, str) else str(prompt)
+        return estimate_tokens(text) + (max_tokens or DEFAULT_COMPLETION_TOKENS)
+    
+    def _record_usage(self, prompt, completion):
+        """Count a successful call; Groq's reported usage is used when the response carries it"""
+        usage = getattr(completion, "usage_metadata", None) or {}
+        text = prompt if isinstance(prompt, str) else str(prompt)
+        content = completion if isinstance(completion, str) else getattr(completion, "content", "")
+        LLM_CALLS.inc(outcome="ok")
+        LLM_TOKENS.inc(usage.get("input_tokens") or estimate_tokens(text), kind="prompt")
+        LLM_TOKENS.inc(usage.get("output_tokens") or estimate_tokens(content), kind="completion")
+    
+    def _retry_wait(self, error, attempt):
+        """How long to wait before retry `attempt`, or None if the error should be raised"""
+        if "429" in str(error) or "Too Many Requests" in str(error):
+            LLM_CALLS.inc(outcome="rate_limited")
+            retry_after = retry_after_from_error(error)
+            if retry_after is not None:
+                wait_time = retry_after + random.uniform(0, 1)
+                # Everyone sharing the limiter backs off, not just this caller
+                self.limiter.block_for(wait_time)
+            else:
+                wait_time = jittered_backoff(attempt, self.base_wait_time)
+            self.logger.warning(f"Rate limit hit. Waiting {wait_time:.1f} seconds before retry {attempt}/{self.retry_limit}")
+            return wait_time
         
-        if time_since_last_call < self.min_time_between_calls:
-            sleep_time = self.min_time_between_calls - time_since_last_call
-            self.logger.info(f"Rate limiting: Sleeping for {sleep_time:.2f} seconds")
-            time.sleep(sleep_time)
+        LLM_CALLS.inc(outcome="error")
+        self.logger.error(f"Error calling LLM: {str(error)}")
+        if attempt >= self.retry_limit:
+            return None
+        wait_time = jittered_backoff(attempt, self.base_wait_time)
+        self.logger.info(f"Retrying in {wait_time:.1f} seconds. Attempt {attempt}/{self.retry_limit}")
+        return wait_time
+    
+    def invoke(self, prompt, max_tokens=None, priority=INTERACTIVE):
+        """Invoke the LLM with rate limiting and retries"""
+        kwargs = {}
+        if max_tokens:
+            kwargs["max_tokens"] = max_tokens
+        budget = self._budget(prompt, max_tokens)
         
         attempt = 0
         while attempt < self.retry_limit:
+            self.limiter.acquire(budget, priority)
             try:
-                
-                self.last_call_time = time.time()
-                
-                
-                kwargs = {}
-                if max_tokens:
-                    kwargs["max_tokens"] = max_tokens
-                    
                 response = self.llm.invoke(prompt, **kwargs)
+                self._record_usage(prompt, response)
                 return response
-                
             except Exception as e:
                 attempt += 1
-                wait_time = self.base_wait_time * (2 ** attempt)  
-                
-                if "429" in str(e) or "Too Many Requests" in str(e):
-                    self.logger.warning(f"Rate limit hit. Waiting {wait_time} seconds before retry {attempt}/{self.retry_limit}")
-                    time.sleep(wait_time)
-                else:
-                    self.logger.error(f"Error calling LLM: {str(e)}")
-                    if attempt < self.retry_limit:
-                        self.logger.info(f"Retrying in {wait_time} seconds. Attempt {attempt}/{self.retry_limit}")
-                        time.sleep(wait_time)
-                    else:
-                        raise
+                wait_time = self._retry_wait(e, attempt)
+                if wait_time is None:
+                    raise
+                time.sleep(wait_time)
+        
+        raise Exception(f"Failed to get response after {self.retry_limit} attempts")
+    
+    async def ainvoke(self, prompt, max_tokens=None, priority=INTERACTIVE):
+        """Async invoke with the same rate limiting and retries, without blocking the event loop"""
+        kwargs = {}
+        if max_tokens:
+            kwargs["max_tokens"] = max_tokens
+        budget = self._budget(prompt, max_tokens)
+        
+        attempt = 0
+        while attempt < self.retry_limit:
+            await self.limiter.acquire_async(budget, priority)
+            try:
+                response = await self.llm.ainvoke(prompt, **kwargs)
+                self._record_usage(prompt, response)
+                return response
+            except Exception as e:
+                attempt += 1
+                # A 429 pauses the shared limiter, which writes to the cache backend
+                wait_time = await asyncio.to_thread(self._retry_wait, e, attempt)
+                if wait_time is None:
+                    raise
+                await asyncio.sleep(wait_time)
+        
+        raise Exception(f"Failed to get response after {self.retry_limit} attempts")
+    
+    async def astream(self, prompt, max_tokens=None, priority=INTERACTIVE):
+        """Yield answer tokens as they arrive; retries only happen before the first token"""
+        kwargs = {}
+        if max_tokens:
+            kwargs["max_tokens"] = max_tokens
+        budget = self._budget(prompt, max_tokens)
+        
+        attempt = 0
+        while attempt < self.retry_limit:
+            await self.limiter.acquire_async(budget, priority)
+            started = False
+            streamed = []
+            try:
+                async for chunk in self.llm.astream(prompt, **kwargs):
+                    started = True
+                    if chunk.content:
+                        streamed.append(chunk.content)
+                        yield chunk.content
+                self._record_usage(prompt, "".join(streamed))
+                return
+            except Exception as e:
+                if started:
+                    raise
+                attempt += 1
+                # A 429 pauses the shared limiter, which writes to the cache backend
+                wait_time = await asyncio.to_thread(self._retry_wait, e, attempt)
+                if wait_time is None:
+                    raise
+                await asyncio.sleep(wait_time)
         
         raise Exception(f"Failed to get response after {self.retry_limit} attempts")
 
-# Singleton instance for use across the application
-llm_instance = RateLimitedLLM()
+# Singleton instance for use across the application, created on first use
+llm_instance = None
+_llm_lock = threading.Lock()
 
 def get_llm():
     """Get the singleton LLM instance"""
-    return llm_instance
\ No newline at end of file
+    global llm_instance
+    if llm_instance is None:
+        with _llm_lock:
+            if llm_instance is None:
+                llm_instance = RateLimitedLLM()
+    return llm_instance
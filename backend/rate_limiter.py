@@ -0,0 +1,176 @@
+import re
+import time
+import random
+import asyncio
+import logging
+import threading
+from cache import TTLCache
+from metrics import RATE_LIMIT_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 0
+BACKGROUND = 1
+
+_encoding = None
+
+
+def estimate_tokens(text):
+    """Count prompt tokens with tiktoken, falling back to a chars/4 estimate"""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return max(1, len(text) // 4)
+
+
+def retry_after_from_error(error):
+    """Seconds the server asked us to wait, from Retry-After headers or the error message"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for header in ("retry-after", "Retry-After"):
+        value = headers.get(header)
+        if value:
+            try:
+                return float(value)
+            except ValueError:
+                pass
+    # Groq writes "try again in 1m2.5s", "try again in 7.66s" or "try again in 450ms"
+    match = re.search(r"try again in (?:(\d+)m(?!s))?([\d.]+)(ms|s)", str(error))
+    if match:
+        seconds = float(match.group(2)) / (1000 if match.group(3) == "ms" else 1)
+        return int(match.group(1) or 0) * 60 + seconds
+    return None
+
+
+def jittered_backoff(attempt, base=1.0, cap=60.0):
+    """Full-jitter exponential backoff"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute token buckets shared by threads and coroutines.
+    The buckets, the 429 pause and the "interactive caller waiting" flag live in `state`, a
+    cache backend: with the sqlite or redis backend every uvicorn worker and job process draws
+    on the same Groq budget. Background callers may only spend the budget above
+    `interactive_reserve` and always yield to waiting interactive callers.
+    """
+
+    def __init__(self, requests_per_minute=30, tokens_per_minute=6000, interactive_reserve=0.25, state=None, key="groq"):
+        self.rpm = requests_per_minute
+        self.tpm = tokens_per_minute
+        self.interactive_reserve = interactive_reserve
+        # Not `state or ...`: an empty TTLCache is falsy
+        self.state = state if state is not None else TTLCache("rate_limiter", max_entries=10)
+        self.key = key
+        self._lock = threading.Lock()
+        self.total_wait = 0.0
+        self.throttled = 0
+
+    def _refill(self, bucket, now):
+        """The bucket as of `now`; a missing bucket starts full"""
+        if bucket is None:
+            bucket = {"requests": float(self.rpm), "tokens": float(self.tpm), "updated": now,
+                      "blocked_until": 0.0, "interactive_until": 0.0}
+        elapsed = max(0.0, now - bucket["updated"])
+        bucket["updated"] = now
+        bucket["requests"] = min(self.rpm, bucket["requests"] + elapsed * self.rpm / 60.0)
+        bucket["tokens"] = min(self.tpm, bucket["tokens"] + elapsed * self.tpm / 60.0)
+        return bucket
+
+    def try_acquire(self, tokens, priority=INTERACTIVE):
+        """Take budget for one call if available; otherwise return seconds to wait before retrying"""
+        # A single oversized prompt can never fit the bucket; let it through when the bucket is full
+        tokens = min(tokens, self.tpm)
+
+        def take(bucket):
+            # Wall-clock time, since the bucket is shared with other processes
+            now = time.time()
+            bucket = self._refill(bucket, now)
+            if now < bucket["blocked_until"]:
+                return bucket, bucket["blocked_until"] - now
+
+            reserve_requests = reserve_tokens = 0.0
+            if priority == BACKGROUND:
+                if now < bucket["interactive_until"]:
+                    return bucket, 0.25
+                reserve_requests = self.rpm * self.interactive_reserve
+                reserve_tokens = self.tpm * self.interactive_reserve
+
+            need_requests = 1 + reserve_requests - bucket["requests"]
+            need_tokens = tokens + reserve_tokens - bucket["tokens"]
+            if need_requests <= 0 and need_tokens <= 0:
+                bucket["requests"] -= 1
+                bucket["tokens"] -= tokens
+                return bucket, 0.0
+            wait = max(need_requests * 60.0 / self.rpm, need_tokens * 60.0 / self.tpm, 0.01)
+            if priority == INTERACTIVE:
+                # Background callers in every process hold off until this caller has been served
+                bucket["interactive_until"] = max(bucket["interactive_until"], now + wait + 1.0)
+            return bucket, wait
+
+        return self.state.update(self.key, take)
+
+    def acquire(self, tokens, priority=INTERACTIVE):
+        """Block the calling thread until budget is available"""
+        waited = 0.0
+        while True:
+            wait = self.try_acquire(tokens, priority)
+            if wait <= 0:
+                break
+            time.sleep(wait)
+            waited += wait
+        self._record(waited, priority)
+        return waited
+
+    async def acquire_async(self, tokens, priority=INTERACTIVE):
+        """Await budget without blocking the event loop"""
+        waited = 0.0
+        while True:
+            # try_acquire writes the shared state (a SQLite transaction or a Redis round trip)
+            wait = await asyncio.to_thread(self.try_acquire, tokens, priority)
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+            waited += wait
+        self._record(waited, priority)
+        return waited
+
+    def block_for(self, seconds):
+        """Pause every caller in every process, e.g. after a 429 with Retry-After"""
+        def block(bucket):
+            now = time.time()
+            bucket = self._refill(bucket, now)
+            bucket["blocked_until"] = max(bucket["blocked_until"], now + seconds)
+            return bucket, None
+
+        self.state.update(self.key, block)
+
+    def stats(self):
+        now = time.time()
+        bucket = self._refill(self.state.get(self.key), now)
+        with self._lock:
+            return {
+                "requests_available": round(bucket["requests"], 2),
+                "tokens_available": round(bucket["tokens"], 1),
+                "requests_per_minute": self.rpm,
+                "tokens_per_minute": self.tpm,
+                "interactive_waiting": now < bucket["interactive_until"],
+                "blocked_seconds": round(max(0.0, bucket["blocked_until"] - now), 1),
+                "throttled_calls": self.throttled,
+                "total_wait_seconds": round(self.total_wait, 2),
+            }
+
+    def _record(self, waited, priority):
+        RATE_LIMIT_WAIT_SECONDS.observe(waited, priority="interactive" if priority == INTERACTIVE else "background")
+        if waited:
+            with self._lock:
+                self.throttled += 1
+                self.total_wait += waited
+            logger.info(f"Rate limiting: waited {waited:.2f} seconds for LLM budget")
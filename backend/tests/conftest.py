@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The backend runs as flat modules from its own directory (uvicorn app:app)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
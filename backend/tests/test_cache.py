@@ -0,0 +1,90 @@
+import time
+import threading
+
+import pytest
+
+from cache import TTLCache, SQLiteCache, RedisCache
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def cache(request, tmp_path):
+    if request.param == "memory":
+        return TTLCache("test", max_entries=100)
+    return SQLiteCache("test", str(tmp_path / "cache.db"), max_entries=100)
+
+
+def increment(current):
+    value = (current or 0) + 1
+    return value, value
+
+
+def test_update_sees_none_for_missing_key(cache):
+    seen = []
+
+    def fn(current):
+        seen.append(current)
+        return {"n": 1}, "result"
+
+    assert cache.update("k", fn) == "result"
+    assert seen == [None]
+    assert cache.get("k") == {"n": 1}
+
+
+def test_update_sees_current_value(cache):
+    cache.set("k", 41)
+    assert cache.update("k", increment) == 42
+    assert cache.get("k") == 42
+
+
+def test_update_treats_expired_value_as_missing(cache):
+    cache.set("k", 5, ttl=0.05)
+    time.sleep(0.1)
+    assert cache.update("k", increment) == 1
+
+
+def test_update_applies_ttl(cache):
+    cache.update("k", increment, ttl=0.05)
+    time.sleep(0.1)
+    assert cache.get("k") is None
+
+
+def test_failed_update_leaves_value_untouched(cache):
+    cache.set("k", 1)
+
+    def fail(current):
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        cache.update("k", fail)
+    assert cache.get("k") == 1
+    # A failed update must not leave a transaction open
+    assert cache.update("k", increment) == 2
+
+
+def test_concurrent_updates_are_atomic(cache):
+    def worker():
+        for _ in range(50):
+            cache.update("counter", increment)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.get("counter") == 400
+
+
+def test_sqlite_update_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "cache.db")
+    first = SQLiteCache("shared", path)
+    second = SQLiteCache("shared", path)
+    first.update("k", increment)
+    assert second.update("k", increment) == 2
+
+
+def test_redis_update():
+    fakeredis = pytest.importorskip("fakeredis")
+    cache = RedisCache("test", client=fakeredis.FakeRedis())
+    assert cache.update("k", increment) == 1
+    assert cache.update("k", increment) == 2
+    assert cache.get("k") == 2
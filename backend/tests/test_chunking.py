@@ -0,0 +1,57 @@
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from chunking import iter_chunks, transcript_pieces
+from timed_transcript import TimedTranscript
+
+TEXT = " ".join(f"Sentence number {i} says something, then stops." for i in range(120))
+
+
+def chunk_spans(chunks):
+    return [(c.metadata["start_index"], c.page_content) for c in chunks]
+
+
+def test_offsets_index_into_the_text():
+    chunks = list(iter_chunks([(None, TEXT)], chunk_size=300, chunk_overlap=60))
+    assert len(chunks) > 1
+    for position, chunk in enumerate(chunks):
+        start = chunk.metadata["start_index"]
+        assert TEXT[start:start + len(chunk.page_content)] == chunk.page_content
+        assert len(chunk.page_content) <= 300
+        assert chunk.metadata["position"] == position
+        assert "start_time" not in chunk.metadata
+
+
+def test_chunks_overlap_and_cover_the_text():
+    chunks = list(iter_chunks([(None, TEXT)], chunk_size=300, chunk_overlap=60))
+    assert chunks[0].metadata["start_index"] == 0
+    for previous, current in zip(chunks, chunks[1:]):
+        previous_end = previous.metadata["start_index"] + len(previous.page_content)
+        assert current.metadata["start_index"] < previous_end
+        assert current.metadata["start_index"] > previous.metadata["start_index"]
+    last = chunks[-1]
+    assert last.metadata["start_index"] + len(last.page_content) == len(TEXT.rstrip())
+
+
+def test_piece_boundaries_do_not_change_the_chunks():
+    whole = chunk_spans(iter_chunks([(None, TEXT)], chunk_size=300, chunk_overlap=60))
+    pieces = [(None, TEXT[i:i + 37]) for i in range(0, len(TEXT), 37)]
+    assert chunk_spans(iter_chunks(pieces, chunk_size=300, chunk_overlap=60)) == whole
+
+
+def test_timed_chunks_carry_the_start_time_of_their_offset():
+    segments = [{"text": f"Segment {i} talks about topic {i} for a while.", "start": i * 5.0} for i in range(80)]
+    transcript = TimedTranscript.from_segments(segments)
+    chunks = list(iter_chunks(transcript_pieces(transcript), chunk_size=200, chunk_overlap=40))
+    assert len(chunks) > 1
+    for chunk in chunks:
+        start = chunk.metadata["start_index"]
+        assert str(transcript)[start:start + len(chunk.page_content)] == chunk.page_content
+        assert chunk.metadata["start_time"] == transcript.time_at(start)
+        assert chunk.metadata["end_time"] >= chunk.metadata["start_time"]
+
+
+def test_short_text_is_one_chunk():
+    chunks = list(iter_chunks([(None, "  just a few words  ")], chunk_size=300, chunk_overlap=60))
+    assert chunk_spans(chunks) == [(2, "just a few words")]
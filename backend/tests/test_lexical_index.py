@@ -0,0 +1,27 @@
+import pytest
+
+from lexical_index import reciprocal_rank_fusion
+
+
+def test_single_ranking_scores_by_rank():
+    fused = reciprocal_rank_fusion([["a", "b", "c"]], k=60)
+    assert fused == pytest.approx({"a": 1 / 61, "b": 1 / 62, "c": 1 / 63})
+
+
+def test_documents_in_both_rankings_win():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "d", "b"]], k=60)
+    ranked = sorted(fused, key=fused.get, reverse=True)
+    assert ranked[0] in ("b", "c")
+    assert set(ranked[:2]) == {"b", "c"}
+    assert fused["c"] == pytest.approx(1 / 63 + 1 / 61)
+
+
+def test_smaller_k_favours_top_ranks():
+    low = reciprocal_rank_fusion([["a", "b"]], k=1)
+    high = reciprocal_rank_fusion([["a", "b"]], k=100)
+    assert low["a"] / low["b"] > high["a"] / high["b"]
+
+
+def test_empty_rankings():
+    assert reciprocal_rank_fusion([]) == {}
+    assert reciprocal_rank_fusion([[], []]) == {}
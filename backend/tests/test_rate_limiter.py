@@ -0,0 +1,92 @@
+import pytest
+
+import rate_limiter
+from cache import TTLCache
+from rate_limiter import RateLimiter, INTERACTIVE, BACKGROUND, retry_after_from_error
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limiter.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def limiter(clock):
+    return RateLimiter(requests_per_minute=10, tokens_per_minute=1000, interactive_reserve=0.25)
+
+
+def test_full_bucket_serves_both_lanes(limiter):
+    assert limiter.try_acquire(100, INTERACTIVE) == 0
+    assert limiter.try_acquire(100, BACKGROUND) == 0
+
+
+def test_background_cannot_spend_the_interactive_reserve(limiter):
+    assert limiter.try_acquire(800, BACKGROUND) > 0
+    assert limiter.try_acquire(800, INTERACTIVE) == 0
+
+
+def test_background_yields_to_waiting_interactive_caller(limiter, clock):
+    assert limiter.try_acquire(900, INTERACTIVE) == 0
+    wait = limiter.try_acquire(500, INTERACTIVE)
+    assert wait == pytest.approx(24.0)
+    # Even a tiny background call waits while an interactive caller is queued
+    assert limiter.try_acquire(1, BACKGROUND) == 0.25
+
+    clock.now += wait + 1.5
+    assert limiter.try_acquire(1, BACKGROUND) == 0
+
+
+def test_request_budget_is_enforced(limiter):
+    for _ in range(10):
+        assert limiter.try_acquire(1, INTERACTIVE) == 0
+    assert limiter.try_acquire(1, INTERACTIVE) == pytest.approx(6.0)
+
+
+def test_block_for_pauses_every_lane(limiter, clock):
+    limiter.block_for(5)
+    assert limiter.try_acquire(1, INTERACTIVE) == pytest.approx(5.0)
+    assert limiter.try_acquire(1, BACKGROUND) == pytest.approx(5.0)
+    clock.now += 5
+    assert limiter.try_acquire(1, INTERACTIVE) == 0
+
+
+def test_oversized_prompt_passes_on_a_full_bucket(limiter):
+    assert limiter.try_acquire(5000, INTERACTIVE) == 0
+
+
+def test_limiters_sharing_state_share_the_budget(clock):
+    state = TTLCache("rate_limiter", max_entries=10)
+    first = RateLimiter(requests_per_minute=10, tokens_per_minute=1000, state=state)
+    second = RateLimiter(requests_per_minute=10, tokens_per_minute=1000, state=state)
+    assert first.try_acquire(900, INTERACTIVE) == 0
+    assert second.try_acquire(500, INTERACTIVE) > 0
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("Rate limit reached. Please try again in 7.66s.", 7.66),
+    ("Please try again in 1m2.5s.", 62.5),
+    ("Please try again in 450ms.", 0.45),
+    ("Something else went wrong", None),
+])
+def test_retry_after_from_error_message(message, expected):
+    result = retry_after_from_error(Exception(message))
+    assert result == (pytest.approx(expected) if expected is not None else None)
+
+
+def test_retry_after_header_wins():
+    class Response:
+        headers = {"retry-after": "3"}
+
+    error = Exception("try again in 10s")
+    error.response = Response()
+    assert retry_after_from_error(error) == 3.0
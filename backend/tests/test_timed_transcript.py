@@ -0,0 +1,34 @@
+import pytest
+
+from timed_transcript import parse_time_range, parse_timestamp
+
+
+@pytest.mark.parametrize("value, seconds", [("0:45", 45.0), ("12:34", 754.0), ("1:02:03", 3723.0)])
+def test_parse_timestamp(value, seconds):
+    assert parse_timestamp(value) == seconds
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("What is said between 1:00 and 2:30?", (60.0, 150.0)),
+    ("Summarize from 2:30 to 1:00", (60.0, 150.0)),
+    ("what happens at 12:34", (694.0, 814.0)),
+    ("around 0:30, what did they show?", (0.0, 90.0)),
+    ("at 1:02:03 who is speaking", (3663.0, 3783.0)),
+])
+def test_parse_time_range(query, expected):
+    assert parse_time_range(query) == expected
+
+
+@pytest.mark.parametrize("query", [
+    "What is this video about?",
+    "what happens at 5:00pm",
+    "they met around 10:30 a.m. right?",
+    "from 9:00am to 5:00pm",
+    "at 12:345",
+])
+def test_parse_time_range_ignores_non_offsets(query):
+    assert parse_time_range(query) is None
+
+
+def test_point_window_is_configurable():
+    assert parse_time_range("at 2:00", window=30) == (90.0, 150.0)
@@ -0,0 +1,112 @@
+import re
+from array import array
+from bisect import bisect_right
+
+
+def _segment_fields(segment):
+    """(text, start) from a youtube-transcript-api segment (dict in <1.0, snippet object in >=1.0)"""
+    if isinstance(segment, dict):
+        return segment.get("text", ""), float(segment.get("start", 0.0))
+    return getattr(segment, "text", ""), float(getattr(segment, "start", 0.0))
+
+
+def format_timestamp(seconds):
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
+
+
+class TimedTranscript(str):
+    """
+    Transcript text that remembers where each caption segment begins: `offsets[i]` is the
+    character offset of segment i and `starts[i]` its start time in seconds. It is a str,
+    so code that only needs the text keeps working unchanged.
+    """
+
+    def __new__(cls, text, offsets=(), starts=()):
+        obj = super().__new__(cls, text)
+        obj.offsets = array("l", offsets)
+        obj.starts = array("d", starts)
+        return obj
+
+    @classmethod
+    def from_segments(cls, segments):
+        parts, offsets, starts = [], [], []
+        position = 0
+        for segment in segments:
+            text, start = _segment_fields(segment)
+            text = text.strip()
+            if not text:
+                continue
+            if parts:
+                position += 1  # joining space
+            offsets.append(position)
+            starts.append(start)
+            parts.append(text)
+            position += len(text)
+        return cls(" ".join(parts), offsets, starts)
+
+    @classmethod
+    def from_cached(cls, value):
+        """Rebuild from to_dict() output; plain strings come back untimed"""
+        if isinstance(value, dict):
+            return cls(value["text"], value.get("offsets", ()), value.get("starts", ()))
+        return value
+
+    def to_dict(self):
+        return {"text": str(self), "offsets": list(self.offsets), "starts": list(self.starts)}
+
+    @property
+    def has_timestamps(self):
+        return len(self.offsets) > 0
+
+    def segments(self):
+        """Yield (start_seconds, text) for each caption segment"""
+        for i, offset in enumerate(self.offsets):
+            end = self.offsets[i + 1] if i + 1 < len(self.offsets) else len(self)
+            yield self.starts[i], str.__getitem__(self, slice(offset, end))
+
+    def time_at(self, char_offset):
+        """Start time of the segment containing char_offset"""
+        if not self.has_timestamps:
+            return None
+        index = max(0, bisect_right(self.offsets, char_offset) - 1)
+        return self.starts[index]
+
+    def map_text(self, new_text):
+        """
+        Carry timing over to a rewritten version of this text (translation, LLM cleanup)
+        by scaling segment offsets proportionally to the new length.
+        """
+        if not self.has_timestamps or not len(self):
+            return new_text
+        ratio = len(new_text) / len(self)
+        offsets = [min(int(o * ratio), max(len(new_text) - 1, 0)) for o in self.offsets]
+        return TimedTranscript(new_text, offsets, self.starts)
+
+
+# Not followed by more digits or am/pm, so clock times like "at 5:00pm" aren't read as offsets
+_TIMESTAMP = r"(\d{1,2}(?::\d{2}){1,2})(?![\d:]|\s*[ap]\.?m\b)"
+_RANGE_PATTERN = re.compile(rf"(?:between|from)\s+{_TIMESTAMP}\s+(?:and|to|-)\s+{_TIMESTAMP}", re.IGNORECASE)
+_POINT_PATTERN = re.compile(rf"\b(?:at|around)\s+{_TIMESTAMP}", re.IGNORECASE)
+
+
+def parse_timestamp(value):
+    seconds = 0
+    for part in value.split(":"):
+        seconds = seconds * 60 + int(part)
+    return float(seconds)
+
+
+def parse_time_range(query, window=60):
+    """Extract (start, end) seconds from phrases like "between 1:00 and 2:30" or "at 12:34" """
+    match = _RANGE_PATTERN.search(query)
+    if match:
+        start, end = parse_timestamp(match.group(1)), parse_timestamp(match.group(2))
+        return (min(start, end), max(start, end))
+    match = _POINT_PATTERN.search(query)
+    if match:
+        point = parse_timestamp(match.group(1))
+        return (max(0.0, point - window), point + window)
+    return None
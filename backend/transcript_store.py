@@ -0,0 +1,125 @@
+import os
+import re
+import gzip
+import json
+import time
+import logging
+import tempfile
+import threading
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_FILENAME = re.compile(r"^(?P<language>[\w-]+)\.(?P<kind>manual|generated)\.json\.gz$")
+
+
+def segment_dict(segment):
+    """Plain {"text", "start", "duration"} from a youtube-transcript-api segment (dict or snippet object)"""
+    if isinstance(segment, dict):
+        return {"text": segment.get("text", ""), "start": float(segment.get("start", 0.0)),
+                "duration": float(segment.get("duration", 0.0))}
+    return {"text": getattr(segment, "text", ""), "start": float(getattr(segment, "start", 0.0)),
+            "duration": float(getattr(segment, "duration", 0.0))}
+
+
+def preference(language, is_generated, languages):
+    """Sort key for stored or listed transcripts: manual before generated, then the caller's language order"""
+    rank = languages.index(language) if language in languages else len(languages)
+    return (bool(is_generated), rank)
+
+
+class TranscriptStore:
+    """
+    Durable transcript segments on disk, one gzip JSON file per video and language:
+    {dir}/{video_id}/{language}.{manual|generated}.json.gz. Each file carries fetched_at,
+    source and is_generated next to the segments. Survives restarts and redeploys, so
+    a video is only ever fetched through the proxy once.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    def _video_dir(self, video_id):
+        safe_id = "".join(c for c in video_id if c.isalnum() or c in "-_")
+        return os.path.join(self.directory, safe_id)
+
+    def available(self, video_id):
+        """[(language, is_generated)] stored for a video"""
+        try:
+            names = os.listdir(self._video_dir(video_id))
+        except FileNotFoundError:
+            return []
+        found = []
+        for name in names:
+            match = _FILENAME.match(name)
+            if match:
+                found.append((match.group("language"), match.group("kind") == "generated"))
+        return found
+
+    def load(self, video_id, languages=()):
+        """The preferred stored record for a video, or None. Reads only the chosen file"""
+        languages = list(languages)
+        candidates = sorted(self.available(video_id), key=lambda c: preference(c[0], c[1], languages))
+        for language, is_generated in candidates:
+            path = os.path.join(self._video_dir(video_id), f"{language}.{'generated' if is_generated else 'manual'}.json.gz")
+            try:
+                with gzip.open(path, "rt", encoding="utf-8") as f:
+                    record = json.load(f)
+                with self._lock:
+                    self.hits += 1
+                return record
+            except Exception as e:
+                logger.warning(f"Discarding unreadable stored transcript {path}: {str(e)}")
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def save(self, video_id, language, segments, source, is_generated):
+        """Write a fetched transcript atomically; returns the stored record"""
+        record = {
+            "video_id": video_id,
+            "language": language,
+            "is_generated": bool(is_generated),
+            "source": source,
+            "fetched_at": time.time(),
+            "segments": [segment_dict(s) for s in segments],
+        }
+        video_dir = self._video_dir(video_id)
+        os.makedirs(video_dir, exist_ok=True)
+        path = os.path.join(video_dir, f"{language}.{'generated' if is_generated else 'manual'}.json.gz")
+        fd, tmp_path = tempfile.mkstemp(dir=video_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                f.write(json.dumps(record, separators=(",", ":")).encode("utf-8"))
+            os.replace(tmp_path, path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        with self._lock:
+            self.writes += 1
+        return record
+
+    def stats(self):
+        return {"directory": self.directory, "hits": self.hits, "misses": self.misses, "writes": self.writes}
+
+
+_store = None
+
+
+def get_transcript_store():
+    """Process-wide transcript store in TRANSCRIPT_STORE_DIR"""
+    global _store
+    if _store is None:
+        _store = TranscriptStore(os.getenv("TRANSCRIPT_STORE_DIR", os.path.join(tempfile.gettempdir(), "tubemate", "transcripts")))
+    return _store
@@ -0,0 +1,102 @@
+import os
+import re
+import hashlib
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from cache import SQLiteCache
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Latin, Devanagari (danda) and CJK sentence terminators
+SENTENCE_END = re.compile(r"(?<=[.!?।॥。！？])\s+")
+
+MAX_CHUNK_CHARS = 2000  # GoogleTranslator rejects requests over ~5000 chars
+
+_memo = None
+
+
+def get_translation_memo():
+    """On-disk memo of translated chunks keyed by content hash"""
+    global _memo
+    if _memo is None:
+        path = os.getenv("TRANSLATION_CACHE_PATH", os.path.join(tempfile.gettempdir(), "tubemate", "translations.db"))
+        _memo = SQLiteCache("translations", path, max_entries=200000)
+    return _memo
+
+
+def split_sentences(text, max_chars=MAX_CHUNK_CHARS):
+    """Pack whole sentences into chunks of at most max_chars, splitting overlong sentences on spaces"""
+    chunks = []
+    current = ""
+    for sentence in SENTENCE_END.split(text):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(sentence[:cut])
+            sentence = sentence[cut:].lstrip()
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _memo_key(source, target, chunk):
+    return f"{source}:{target}:" + hashlib.sha1(chunk.encode("utf-8")).hexdigest()
+
+
+def _default_translator(source, target):
+    from deep_translator import GoogleTranslator
+    return GoogleTranslator(source=source, target=target)
+
+
+def translate_text(text, source, target="en", translator_factory=None, concurrency=None, batch_size=4, memo=None):
+    """
+    Translate text chunk by chunk, reusing memoized chunks and sending the rest as
+    concurrent batches. translator_factory(source, target) must return an object with
+    translate() (and optionally translate_batch()), which lets tests pass a local stub.
+    """
+    translator_factory = translator_factory or _default_translator
+    concurrency = concurrency or int(os.getenv("TRANSLATION_CONCURRENCY", "4"))
+    memo = memo if memo is not None else get_translation_memo()
+
+    chunks = split_sentences(text)
+    translated = [None] * len(chunks)
+    missing = []
+    for i, chunk in enumerate(chunks):
+        cached = memo.get(_memo_key(source, target, chunk))
+        if cached is not None:
+            translated[i] = cached
+        else:
+            missing.append(i)
+
+    logger.info(f"Translating {len(missing)}/{len(chunks)} chunks from {source} to {target} ({len(chunks) - len(missing)} memoized)")
+
+    def run_batch(indices):
+        translator = translator_factory(source, target)
+        batch = [chunks[i] for i in indices]
+        if hasattr(translator, "translate_batch") and len(batch) > 1:
+            results = translator.translate_batch(batch)
+        else:
+            results = [translator.translate(chunk) for chunk in batch]
+        return indices, results
+
+    batches = [missing[i:i + batch_size] for i in range(0, len(missing), batch_size)]
+    if batches:
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(batches)), thread_name_prefix="translate") as pool:
+            for indices, results in pool.map(run_batch, batches):
+                for i, result in zip(indices, results):
+                    # Leave chunks the service returned nothing for untranslated
+                    translated[i] = result or chunks[i]
+                    if result:
+                        memo.set(_memo_key(source, target, chunks[i]), result)
+
+    return " ".join(translated)
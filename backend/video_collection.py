@@ -0,0 +1,291 @@
+"""Multi-video collections: one merged FAISS + BM25 index over the chunks of many videos."""
+
+import os
+import time
+import fcntl
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from langchain_core.documents import Document
+from langchain_community.vectorstores import FAISS
+from cache import create_cache
+from index_cache import config_hash, private_dir, save_index_dir, load_index_dir
+from lexical_index import BM25Index
+from prefetch import load_video_artifacts
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MAX_COLLECTION_VIDEOS = int(os.getenv("MAX_COLLECTION_VIDEOS", "200"))
+
+
+class VideoCollection:
+    """
+    Chunks of several videos in one FAISS index and one BM25 index, so a question across a
+    playlist costs one query embedding and one search. Every chunk's metadata carries its
+    video_id. Videos are only ever appended, reusing the vectors of their per-video index.
+    Retrieval and appends both hold `lock`; appends are quick since nothing is re-embedded.
+    """
+
+    is_long_transcript = True
+
+    def __init__(self, collection_id, fingerprints=None, chunks=None, vector_store=None, lexical_index=None):
+        self.collection_id = collection_id
+        self.fingerprints = fingerprints or {}
+        self.chunks = chunks or []
+        self.vector_store = vector_store
+        self.lexical_index = lexical_index
+        self.lock = threading.Lock()
+        # Identity of the on-disk copy this was loaded from or saved as; None if never persisted
+        self.version = None
+
+    @property
+    def video_ids(self):
+        with self.lock:
+            return list(self.fingerprints)
+
+    @property
+    def fingerprint(self):
+        """Hash of the member videos' transcripts, so cached answers expire when a video is added"""
+        # Read under the lock: a build thread may be adding a video meanwhile
+        with self.lock:
+            payload = "\n".join(f"{v}:{f}" for v, f in sorted(self.fingerprints.items()))
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+    def add_video(self, video_id, artifacts):
+        """Append a video's chunks, vectors and postings. Returns False if it's already a member"""
+        with self.lock:
+            if video_id in self.fingerprints:
+                return False
+            index = artifacts.vector_store.index
+            vectors = index.reconstruct_n(0, index.ntotal)
+            chunks = [
+                Document(page_content=c.page_content, metadata={**c.metadata, "video_id": video_id})
+                for c in artifacts.chunks
+            ]
+            texts = [c.page_content for c in chunks]
+            if self.vector_store is None:
+                self.vector_store = FAISS.from_embeddings(
+                    list(zip(texts, vectors)), artifacts.vector_store.embedding_function,
+                    metadatas=[c.metadata for c in chunks]
+                )
+            else:
+                self.vector_store.add_embeddings(list(zip(texts, vectors)), metadatas=[c.metadata for c in chunks])
+
+            lexical_index = artifacts.lexical_index
+            if lexical_index is None:
+                from yt_chat_rag_using_langchain import english_stopwords
+                lexical_index = BM25Index.from_texts(texts, english_stopwords())
+            if self.lexical_index is None:
+                self.lexical_index = BM25Index({}, [], lexical_index.stopwords, lexical_index.k1, lexical_index.b)
+            self.lexical_index.extend(lexical_index)
+
+            self.chunks.extend(chunks)
+            self.fingerprints[video_id] = artifacts.fingerprint
+            return True
+
+
+class CollectionStore:
+    """
+    Collections in a memory LRU, persisted as one FAISS directory per collection and pipeline.
+    Several worker processes share the directory: builds take a file lock, and a memory copy
+    is reloaded once another worker has saved a newer version.
+    """
+
+    def __init__(self, directory, max_memory_items=8):
+        # Collection directories hold pickles too, see private_dir
+        self.directory = private_dir(directory)
+        self.max_memory_items = max_memory_items
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_locks = {}
+        # Progress records, shared between workers through the cache backend
+        self.records = create_cache("video_collections", max_entries=1000, ttl=7 * 24 * 3600)
+
+    def _path(self, collection_id, pipeline_hash):
+        safe_id = "".join(c for c in collection_id if c.isalnum() or c in "-_")
+        return os.path.join(self.directory, safe_id, pipeline_hash)
+
+    @staticmethod
+    def _disk_version(path):
+        """Identity of the saved meta.json, which changes whenever a save swaps the directory in"""
+        try:
+            stat = os.stat(os.path.join(path, "meta.json"))
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    @contextmanager
+    def build_lock(self, collection_id, pipeline_hash):
+        """Serializes build runs of one collection across threads and worker processes"""
+        path = self._path(collection_id, pipeline_hash)
+        with self._lock:
+            thread_lock = self._build_locks.setdefault(path, threading.Lock())
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with thread_lock, open(f"{path}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def get(self, collection_id, pipeline_hash, embedding, create=False):
+        """
+        The collection from memory while it matches the disk, else from disk; a new empty one
+        if `create`, else None
+        """
+        key = f"{collection_id}:{pipeline_hash}"
+        path = self._path(collection_id, pipeline_hash)
+        version = self._disk_version(path)
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None and cached.version == version:
+                self._memory.move_to_end(key)
+                return cached
+
+        collection = self._load(collection_id, pipeline_hash, embedding) if version is not None else None
+        if collection is not None:
+            collection.version = version
+        else:
+            collection = cached
+        if collection is None and create:
+            collection = VideoCollection(collection_id)
+        if collection is not None:
+            with self._lock:
+                self._memory[key] = collection
+                self._memory.move_to_end(key)
+                while len(self._memory) > self.max_memory_items:
+                    self._memory.popitem(last=False)
+        return collection
+
+    def save(self, collection, pipeline_hash):
+        """Persist a collection; see save_index_dir"""
+        try:
+            with collection.lock:
+                meta = {
+                    "collection_id": collection.collection_id,
+                    "fingerprints": collection.fingerprints,
+                    "chunks": [{"page_content": c.page_content, "metadata": c.metadata} for c in collection.chunks],
+                    "lexical_index": collection.lexical_index.to_dict(),
+                }
+                path = self._path(collection.collection_id, pipeline_hash)
+                save_index_dir(path, collection.vector_store, meta)
+                collection.version = self._disk_version(path)
+        except Exception as e:
+            logger.warning(f"Could not persist collection {collection.collection_id}: {str(e)}")
+
+    def _load(self, collection_id, pipeline_hash, embedding):
+        def build(vector_store, meta, chunks):
+            return VideoCollection(collection_id, meta["fingerprints"], chunks, vector_store,
+                                   BM25Index.from_dict(meta["lexical_index"]))
+
+        return load_index_dir(self._path(collection_id, pipeline_hash), embedding, f"collection {collection_id}", build)
+
+
+_store = None
+
+
+def get_collection_store():
+    """Process-wide collection store in COLLECTION_DIR"""
+    global _store
+    if _store is None:
+        directory = os.getenv("COLLECTION_DIR", os.path.join(tempfile.gettempdir(), "tubemate", "collections"))
+        _store = CollectionStore(directory, int(os.getenv("COLLECTION_MEMORY_ITEMS", "8")))
+    return _store
+
+
+def get_collection(collection_id, create=False):
+    """The collection for the current pipeline configuration, or None if it was never built"""
+    from yt_chat_rag_using_langchain import embedding, PIPELINE_CONFIG
+    return get_collection_store().get(collection_id, config_hash(PIPELINE_CONFIG), embedding, create)
+
+
+def build_collection(collection_id, video_ids, concurrency=4, progress=None):
+    """
+    Add the videos that aren't members yet, building per-video indexes with bounded concurrency
+    and appending each as soon as it's ready. Holds the collection's build lock throughout, so
+    concurrent builds in any worker append to the latest saved version instead of losing videos. `progress(video_id, status, reason)` is called per
+    video. Returns the collection.
+    """
+    from yt_chat_rag_using_langchain import embedding, PIPELINE_CONFIG
+
+    store = get_collection_store()
+    pipeline_hash = config_hash(PIPELINE_CONFIG)
+    with store.build_lock(collection_id, pipeline_hash):
+        # Under the file lock, so this picks up whatever another worker saved last
+        collection = store.get(collection_id, pipeline_hash, embedding, create=True)
+        missing = [v for v in dict.fromkeys(video_ids) if v not in collection.fingerprints]
+        for video_id in set(video_ids) - set(missing):
+            if progress:
+                progress(video_id, "done", None)
+        if not missing:
+            return collection
+
+        def run(video_id):
+            try:
+                return load_video_artifacts(video_id)
+            except Exception as e:
+                logger.error(f"Collection {collection_id}: indexing {video_id} failed: {str(e)}", exc_info=True)
+                return None, f"Error: {str(e)}"
+
+        with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="collection") as pool:
+            futures = {pool.submit(run, video_id): video_id for video_id in missing}
+            for future in as_completed(futures):
+                video_id = futures[future]
+                artifacts, reason = future.result()
+                if artifacts is not None:
+                    collection.add_video(video_id, artifacts)
+                if progress:
+                    progress(video_id, "done" if reason is None else "failed", reason)
+
+        if collection.vector_store is not None:
+            store.save(collection, pipeline_hash)
+        logger.info(f"Collection {collection_id}: {len(collection.fingerprints)} videos, {len(collection.chunks)} chunks")
+        return collection
+
+
+def start_collection_build(collection_id, video_ids, concurrency=4):
+    """Add videos to a collection in a background thread and return its progress record"""
+    records = get_collection_store().records
+    video_ids = list(dict.fromkeys(video_ids))
+    record = records.get(collection_id) or {
+        "collection_id": collection_id,
+        "videos": {},
+        "failed": {},
+        "created_at": time.time(),
+    }
+    record["status"] = "building"
+    record["total"] = len(set(record["videos"]) | set(video_ids))
+    for video_id in video_ids:
+        if record["videos"].get(video_id) != "done":
+            record["videos"][video_id] = "queued"
+            record["failed"].pop(video_id, None)
+    record["updated_at"] = time.time()
+    records.set(collection_id, record)
+    lock = threading.Lock()
+
+    def progress(video_id, status, reason):
+        with lock:
+            record["videos"][video_id] = status
+            if reason:
+                record["failed"][video_id] = reason
+            record["updated_at"] = time.time()
+            records.set(collection_id, record)
+
+    def worker():
+        try:
+            collection = build_collection(collection_id, video_ids, concurrency, progress)
+            record["status"] = "ready" if collection.fingerprints else "failed"
+            record["chunks"] = len(collection.chunks)
+        except Exception as e:
+            logger.error(f"Collection {collection_id} build crashed: {str(e)}", exc_info=True)
+            record["status"] = "failed"
+        record["updated_at"] = time.time()
+        records.set(collection_id, record)
+
+    threading.Thread(target=worker, name=f"collection-{collection_id[:8]}", daemon=True).start()
+    return record
@@ -0,0 +1,172 @@
+import os
+import re
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from cache import create_cache
+from single_flight import SingleFlight
+from rate_limited_llm import get_llm, DEFAULT_MODEL_NAME
+from rate_limiter import INTERACTIVE
+from timed_transcript import format_timestamp
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SUMMARY_SECTION_CHARS = int(os.getenv("SUMMARY_SECTION_CHARS", "8000"))
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "4"))
+SECTION_SUMMARY_TOKENS = 200
+# How many summaries one reduce call combines before the tree grows another level
+REDUCE_FAN_IN = 8
+
+OVERVIEW_PATTERN = re.compile(
+    r"\b(summar(y|ise|ize|izing|ising)|overview|recap|tl;?dr|gist|outline|key (points|takeaways|ideas)|"
+    r"main (points|ideas|topics|takeaways|message)|what('s| is) (this|the) video about|"
+    r"what (does|did) (this|the) video (cover|talk about|discuss)|topics (covered|discussed))\b",
+    re.IGNORECASE,
+)
+
+SECTION_PROMPT = """
+Summarize this part of a YouTube video transcript in a short paragraph.
+Keep names, numbers and conclusions; leave out filler.
+
+TRANSCRIPT PART:
+{text}
+
+SUMMARY:
+"""
+
+REDUCE_PROMPT = """
+Below are summaries of consecutive parts of one YouTube video, in order.
+Combine them into a single coherent summary of the whole, keeping the main points in the order they come up.
+
+PART SUMMARIES:
+{text}
+
+COMBINED SUMMARY:
+"""
+
+summary_flight = SingleFlight("video_summary")
+
+_summary_cache = None
+
+
+def get_summary_cache():
+    global _summary_cache
+    if _summary_cache is None:
+        _summary_cache = create_cache("video_summaries", max_entries=500, ttl=7 * 24 * 3600)
+    return _summary_cache
+
+
+def is_overview_question(query):
+    """Whether a question asks about the video as a whole rather than a specific detail"""
+    return bool(OVERVIEW_PATTERN.search(query))
+
+
+def split_sections(artifacts, section_chars=None):
+    """
+    Group consecutive chunks into sections of about `section_chars`, returning
+    [(start_time, text)]. Text comes from the processed transcript so chunk overlap isn't repeated.
+    """
+    section_chars = section_chars or SUMMARY_SECTION_CHARS
+    transcript = str(artifacts.processed_transcript)
+    sections = []
+    first = last = None
+    for chunk in artifacts.chunks:
+        start = chunk.metadata.get("start_index", 0)
+        end = start + len(chunk.page_content)
+        if first is not None and end - first.metadata.get("start_index", 0) > section_chars:
+            sections.append(_section(transcript, first, last))
+            first = None
+        if first is None:
+            first = chunk
+        last = chunk
+    if first is not None:
+        sections.append(_section(transcript, first, last))
+    return sections
+
+
+def _section(transcript, first, last):
+    start = first.metadata.get("start_index", 0)
+    end = last.metadata.get("start_index", 0) + len(last.page_content)
+    return first.metadata.get("start_time"), transcript[start:end]
+
+
+def _summarize(llm, prompt, text, priority):
+    response = llm.invoke(prompt.format(text=text), max_tokens=SECTION_SUMMARY_TOKENS * 2, priority=priority)
+    return response.content.strip()
+
+
+def _reduce(llm, summaries, priority):
+    """Combine summaries in groups of REDUCE_FAN_IN until one is left"""
+    level = 0
+    while len(summaries) > 1:
+        level += 1
+        groups = [summaries[i:i + REDUCE_FAN_IN] for i in range(0, len(summaries), REDUCE_FAN_IN)]
+        logger.info(f"Reducing {len(summaries)} summaries into {len(groups)} (level {level})")
+        with ThreadPoolExecutor(max_workers=SUMMARY_CONCURRENCY, thread_name_prefix="summary") as pool:
+            summaries = list(pool.map(lambda group: _summarize(llm, REDUCE_PROMPT, "\n\n".join(group), priority), groups))
+    return summaries[0]
+
+
+def build_video_summary(artifacts, priority=INTERACTIVE):
+    """
+    Map-reduce summary of a whole video: every section is summarized concurrently (the shared
+    rate limiter paces the calls), then the section summaries are reduced into one. Use the
+    INTERACTIVE lane while a user waits on the answer and BACKGROUND for prefetch or warm-up.
+    Returns None if any section or the reduce failed, so a partial summary is never cached
+    and the caller falls back to retrieval.
+    """
+    llm = get_llm()
+    sections = split_sections(artifacts)
+    logger.info(f"Summarizing {len(sections)} sections")
+
+    def summarize_section(section):
+        start_time, text = section
+        try:
+            return start_time, _summarize(llm, SECTION_PROMPT, text, priority)
+        except Exception as e:
+            logger.error(f"Error summarizing section at {start_time}: {str(e)}")
+            return start_time, None
+
+    with ThreadPoolExecutor(max_workers=SUMMARY_CONCURRENCY, thread_name_prefix="summary") as pool:
+        results = list(pool.map(summarize_section, sections))
+    if not results or any(summary is None for _, summary in results):
+        return None
+
+    try:
+        summary = _reduce(llm, [summary for _, summary in results], priority)
+    except Exception as e:
+        logger.error(f"Error combining section summaries: {str(e)}")
+        return None
+    return {
+        "summary": summary,
+        "sections": [{"start_time": start_time, "summary": text} for start_time, text in results],
+    }
+
+
+def get_video_summary(artifacts, video_id, priority=INTERACTIVE):
+    """Cached summary tree for a video, built once per processed transcript at `priority`"""
+    cache = get_summary_cache()
+    key = f"{DEFAULT_MODEL_NAME}:{video_id}:{artifacts.fingerprint}"
+    summary = cache.get(key)
+    if summary is not None:
+        logger.info(f"Using cached summary for video {video_id}")
+        return summary
+    return summary_flight.do(key, _build_and_cache, cache, key, artifacts, priority)
+
+
+def _build_and_cache(cache, key, artifacts, priority):
+    summary = cache.get(key)
+    if summary is None:
+        summary = build_video_summary(artifacts, priority)
+        if summary is not None:
+            cache.set(key, summary)
+    return summary
+
+
+def summary_context(summary):
+    """Prompt context for overview questions: the video summary followed by timestamped section summaries"""
+    parts = ["Summary of the whole video:\n" + summary["summary"], "Summaries of each part:"]
+    for section in summary["sections"]:
+        prefix = f"[{format_timestamp(section['start_time'])}] " if section["start_time"] is not None else ""
+        parts.append(prefix + section["summary"])
+    return "\n\n".join(parts)
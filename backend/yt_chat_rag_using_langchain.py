@@ -2,31 +2,90 @@
 """YT-Chat-Rag-using-langchain - Optimized for Long Videos"""
 
 import os
+import asyncio
 import logging
 from langdetect import detect
-from deep_translator import GoogleTranslator
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import FAISS
 from langchain_core.prompts import PromptTemplate
+from langchain_core.documents import Document
 from langchain_core.runnables import RunnableParallel, RunnablePassthrough, RunnableLambda
 from langchain_core.output_parsers import StrOutputParser
-from langchain_huggingface import HuggingFaceEmbeddings
-import re
 import string
+import hashlib
+from difflib import SequenceMatcher
+from concurrent.futures import ThreadPoolExecutor
 import nltk
 import time
-from rate_limited_llm import get_llm
+from rate_limited_llm import get_llm, DEFAULT_MODEL_NAME
+from rate_limiter import BACKGROUND, INTERACTIVE, estimate_tokens
 from transcript_helper import get_transcript
+from cache import create_cache
+from embeddings import create_embedding_service
+from single_flight import SingleFlight
+from answer_cache import get_answer_cache
+from metrics import timed, run_in_executor
+from translation import translate_text
+from timed_transcript import TimedTranscript, format_timestamp, parse_time_range
+from video_summary import get_video_summary, is_overview_question, summary_context
+from chunking import clean_transcript, clean_pieces, assemble_cleaned, iter_chunks, transcript_pieces, chunk_sizes
+from lexical_index import BM25Index, reciprocal_rank_fusion
+from index_cache import VideoArtifacts, get_index_cache, config_hash, transcript_fingerprint
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-embedding = HuggingFaceEmbeddings(model_name='sentence-transformers/all-MiniLM-L6-v2')
+EMBEDDING_MODEL_NAME = 'sentence-transformers/all-MiniLM-L6-v2'
+embedding = create_embedding_service(EMBEDDING_MODEL_NAME)
 
 
-nltk.download('punkt', quiet=True)
-nltk.download('stopwords', quiet=True)
+IMPROVE_CONCURRENCY = int(os.getenv("IMPROVE_CONCURRENCY", "4"))
+
+index_build_flight = SingleFlight("index_build")
+
+RETRIEVAL_RRF_K = int(os.getenv("RETRIEVAL_RRF_K", "60"))
+RETRIEVAL_MMR_LAMBDA = float(os.getenv("RETRIEVAL_MMR_LAMBDA", "0.7"))
+RETRIEVAL_DEDUP_SIMILARITY = float(os.getenv("RETRIEVAL_DEDUP_SIMILARITY", "0.95"))
+
+# Prompt context is capped in tokens rather than chunks; every token counts against the Groq TPM budget
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+CONTEXT_MIN_SCORE_RATIO = float(os.getenv("CONTEXT_MIN_SCORE_RATIO", "0.3"))
+
+# Questions over a collection pick more chunks, but no more than a few from any one video
+COLLECTION_CHUNKS = int(os.getenv("COLLECTION_CHUNKS", "10"))
+COLLECTION_MAX_PER_VIDEO = int(os.getenv("COLLECTION_MAX_PER_VIDEO", "3"))
+COLLECTION_CONTEXT_TOKEN_BUDGET = int(os.getenv("COLLECTION_CONTEXT_TOKEN_BUDGET", "3000"))
+
+# Improved transcripts are expensive (one LLM call per 4k chars) and deterministic enough to reuse
+improved_transcript_cache = create_cache("improved_transcripts", max_entries=500, ttl=7 * 24 * 3600)
+
+_nltk_ready = False
+
+def ensure_nltk_data():
+    """Download NLTK data on first use instead of at import (the Docker image pre-installs it)"""
+    global _nltk_ready
+    if not _nltk_ready:
+        nltk.download('punkt', quiet=True)
+        nltk.download('stopwords', quiet=True)
+        _nltk_ready = True
+
+def english_stopwords():
+    """NLTK's English stopword list, or none if the corpus can't be loaded"""
+    ensure_nltk_data()
+    try:
+        from nltk.corpus import stopwords
+        return frozenset(stopwords.words('english'))
+    except LookupError:
+        logger.warning("NLTK stopwords unavailable, building lexical index without them")
+        return frozenset()
+
+def warm_up():
+    """Load the heavy resources ahead of the first request; safe to call more than once"""
+    start_time = time.time()
+    ensure_nltk_data()
+    embedding.embed_query("warm up")
+    get_llm()
+    logger.info(f"Warm-up complete in {time.time() - start_time:.2f} seconds")
 
 def process_transcript(transcript_text):
     """Clean and translate transcript if needed"""
@@ -37,12 +96,10 @@ def process_transcript(transcript_text):
 
         # Translate if not English
         if lang != 'en':
-            translator = GoogleTranslator(source=lang, target='en')
-            # Translating in chunks 
-            chunk_size = 2000
-            chunks = [transcript_text[i:i+chunk_size] for i in range(0, len(transcript_text), chunk_size)]
-            translated_chunks = [translator.translate(chunk) for chunk in chunks]
-            transcript_text = ' '.join(translated_chunks)
+            translated_text = translate_text(transcript_text, source=lang, target='en')
+            if isinstance(transcript_text, TimedTranscript):
+                translated_text = transcript_text.map_text(translated_text)
+            transcript_text = translated_text
             logger.info(f"Translated from {lang} to English")
 
         return transcript_text
@@ -51,23 +108,43 @@ def process_transcript(transcript_text):
         logger.error(f"Translation error: {str(e)}")
         return transcript_text  
 
-def clean_transcript(text):
-    """Apply NLP cleaning techniques to improve transcript quality"""
+def merge_overlapping_text(previous, following, window_words=80, min_match_words=5):
+    """
+    Join two consecutive chunk rewrites, dropping the start of `following` that repeats
+    the end of `previous` (chunks are cut with overlap, so the LLM rewrites that text twice).
+    """
+    prev_words = previous.split()
+    next_words = following.split()
+    tail = [w.lower().strip(string.punctuation) for w in prev_words[-window_words:]]
+    head = [w.lower().strip(string.punctuation) for w in next_words[:window_words]]
     
-    text = re.sub(r'\[.*?\]', '', text) 
-    text = re.sub(r'\(.*?\)', '', text)  
-    text = re.sub(r'\s+', ' ', text) 
-    text = re.sub(r'(\w)\.(\w)', r'\1. \2', text)  
-    text = re.sub(r'([.!?]){2,}', r'\1', text)  
-    text = re.sub(r"(\w+)'(\w+)", r"\1'\2", text)  
-    return text.strip()
+    match = SequenceMatcher(None, tail, head, autojunk=False).find_longest_match(0, len(tail), 0, len(head))
+    if match.size >= min_match_words:
+        # Keep previous up to the end of the shared run and continue after it in following
+        keep_prev = len(prev_words) - len(tail) + match.a + match.size
+        return " ".join(prev_words[:keep_prev] + next_words[match.b + match.size:])
+    return previous + " " + following
 
 def improve_transcript_with_llm(transcript_text):
     """Use LLM to clean and improve the transcript text - optimized for long transcripts"""
     
+    cache_key = f"{DEFAULT_MODEL_NAME}:{hashlib.sha1(transcript_text.encode('utf-8')).hexdigest()}"
+    cached = improved_transcript_cache.get(cache_key)
+    if cached is not None:
+        logger.info("Using cached improved transcript")
+        return cached
+    
+    improved_transcript, complete = _improve_transcript_with_llm(transcript_text)
+    # Don't pin partially failed improvements in the cache; the next question can retry them
+    if complete:
+        improved_transcript_cache.set(cache_key, improved_transcript)
+    return improved_transcript
+
+def _improve_transcript_with_llm(transcript_text):
+    """Returns (improved_text, complete) where complete is False if any LLM call failed"""
     if len(transcript_text) > 30000:
         logger.info("Transcript is very long. Skipping LLM improvement to avoid rate limits.")
-        return transcript_text
+        return transcript_text, True
         
     cleaning_prompt = """
     You are an expert in correcting and improving automatically generated transcripts.
@@ -93,177 +170,661 @@ def improve_transcript_with_llm(transcript_text):
         if len(transcript_text) > 15000:
             
             logger.info("Using basic cleanup instead of LLM for very long transcript")
-            return clean_transcript(transcript_text)
+            return clean_transcript(transcript_text), True
             
         chunks = []
         overlap = 200
         for i in range(0, len(transcript_text), max_chunk_size - overlap):
             chunks.append(transcript_text[i:i + max_chunk_size])
         
-        improved_chunks = []
-        for i, chunk in enumerate(chunks):
+        def improve_chunk(i, chunk):
             logger.info(f"Processing chunk {i+1}/{len(chunks)} of transcript")
             try:
-                
-                if i > 0:
-                    time.sleep(2)
-                    
                 response = llm.invoke(
-                    cleaning_prompt.format(transcript=chunk)
+                    cleaning_prompt.format(transcript=chunk),
+                    priority=BACKGROUND
                 )
-                improved_chunks.append(response.content)
+                return response.content, True
             except Exception as e:
                 logger.error(f"Error improving transcript chunk: {str(e)}")
-                improved_chunks.append(chunk)
+                return chunk, False
+        
+        # The shared rate limiter paces these calls; the pool only caps in-flight requests
+        with ThreadPoolExecutor(max_workers=IMPROVE_CONCURRENCY, thread_name_prefix="improve") as pool:
+            results = list(pool.map(improve_chunk, range(len(chunks)), chunks))
         
-        improved_transcript = " ".join(improved_chunks)
+        improved_transcript = results[0][0]
+        for chunk, _ in results[1:]:
+            improved_transcript = merge_overlapping_text(improved_transcript, chunk)
+        complete = all(ok for _, ok in results)
     else:
         try:
             response = llm.invoke(
-                cleaning_prompt.format(transcript=transcript_text)
+                cleaning_prompt.format(transcript=transcript_text),
+                priority=BACKGROUND
             )
             improved_transcript = response.content
+            complete = True
         except Exception as e:
             logger.error(f"Error improving transcript: {str(e)}")
             improved_transcript = transcript_text  
+            complete = False
     
-    return improved_transcript
+    return improved_transcript, complete
 
-def create_semantic_chunks(transcript):
-    """Create chunks with better semantic boundaries"""
-    chunk_size = 800  
-    chunk_overlap = 150
-    
-    if len(transcript) > 20000:
-        chunk_size = 1200
-        chunk_overlap = 200
-    
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-        separators=["\n\n", "\n", ". ", "! ", "? ", ";", ",", " ", ""],
-        keep_separator=True
-    )
-    chunks = splitter.create_documents([transcript])
-    
-    for i, chunk in enumerate(chunks):
-        
-        chunk.page_content = chunk.page_content.strip()
-        chunk.metadata["position"] = i
+def _chunk_and_embed(chunk_stream):
+    """
+    Consume a chunk generator, embedding full batches on a worker thread while later chunks
+    are still being cleaned and split. Returns (chunks, vectors).
+    """
+    chunks, futures, batch = [], [], []
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="embed") as pool:
+        with timed("chunking"):
+            for chunk in chunk_stream:
+                chunks.append(chunk)
+                batch.append(chunk.page_content)
+                if len(batch) >= embedding.batch_size:
+                    futures.append(pool.submit(embedding.embed_documents, batch))
+                    batch = []
+            if batch:
+                futures.append(pool.submit(embedding.embed_documents, batch))
+        with timed("embedding"):
+            vectors = [vector for future in futures for vector in future.result()]
+    for chunk in chunks:
         chunk.metadata["total_chunks"] = len(chunks)
-    
-    return chunks
+    return chunks, vectors
 
 def query_rewriting(user_query):
     """Use LLM to rewrite and improve user queries - with rate limiting"""
    
     return user_query
 
-def process_youtube_video(raw_transcript, user_query):
+PIPELINE_CONFIG = {
+    "embedding_model": EMBEDDING_MODEL_NAME,
+    "embedding_backend": embedding.backend,
+    "llm_model": DEFAULT_MODEL_NAME,
+    "long_transcript_chars": 15000,
+    "chunking": "streaming-v3-timed",
+    "lexical_index": "bm25-v1",
+}
+
+
+def build_video_artifacts(raw_transcript):
+    """Run translation, cleaning, improvement, chunking and embedding for a transcript"""
+    logger.info("Processing transcript")
+    with timed("translation"):
+        translated_transcript = process_transcript(raw_transcript)
+    
+    is_long_transcript = len(translated_transcript) > PIPELINE_CONFIG["long_transcript_chars"]
+    timed_input = isinstance(translated_transcript, TimedTranscript) and translated_transcript.has_timestamps
+    chunk_size, chunk_overlap = chunk_sizes(len(translated_transcript))
+    
+    if not is_long_transcript:
+        with timed("cleaning"):
+            cleaned_transcript = clean_transcript(translated_transcript)
+        logger.info("Improving transcript with LLM")
+        with timed("llm_cleanup"):
+            improved_transcript = improve_transcript_with_llm(cleaned_transcript)
+        if isinstance(cleaned_transcript, TimedTranscript):
+            improved_transcript = cleaned_transcript.map_text(improved_transcript)
+        logger.info("Creating semantic chunks")
+        chunked_transcript, vectors = _chunk_and_embed(
+            iter_chunks(transcript_pieces(improved_transcript), chunk_size, chunk_overlap)
+        )
+    else:
+        # Nothing needs the whole cleaned text first, so cleaning, chunking and embedding run as one stream
+        logger.info("Skipping LLM transcript improvement due to length")
+        cleaned_segments = []
+        chunked_transcript, vectors = _chunk_and_embed(
+            iter_chunks(clean_pieces(translated_transcript, cleaned_segments), chunk_size, chunk_overlap)
+        )
+        improved_transcript = assemble_cleaned(cleaned_segments, timed_input)
+    logger.info(f"Created {len(chunked_transcript)} chunks")
+    
+    logger.info("Creating vector store")
+    texts = [c.page_content for c in chunked_transcript]
+    with timed("faiss_build"):
+        vector_store = FAISS.from_embeddings(list(zip(texts, vectors)), embedding, metadatas=[c.metadata for c in chunked_transcript])
+    with timed("lexical_index"):
+        lexical_index = BM25Index.from_texts(texts, english_stopwords())
+    
+    return VideoArtifacts(improved_transcript, chunked_transcript, vector_store, is_long_transcript, lexical_index)
+
+def get_video_artifacts(raw_transcript, video_id=None):
+    """Return cached artifacts for a video, building and caching them on a miss"""
+    cache = get_index_cache()
+    cache_id = video_id or transcript_fingerprint(raw_transcript)
+    pipeline_hash = config_hash(PIPELINE_CONFIG)
+    
+    with timed("index_cache_lookup"):
+        artifacts = cache.get(cache_id, pipeline_hash, embedding)
+    if artifacts is not None:
+        logger.info(f"Using cached index for video {cache_id}")
+        return artifacts
+    
+    # Concurrent questions on a cold video wait for one build instead of each embedding it
+    return index_build_flight.do(f"{cache_id}:{pipeline_hash}", _build_and_cache, cache, cache_id, pipeline_hash, raw_transcript)
+
+def _build_and_cache(cache, cache_id, pipeline_hash, raw_transcript):
+    artifacts = cache.get(cache_id, pipeline_hash, embedding)
+    if artifacts is not None:
+        return artifacts
+    artifacts = build_video_artifacts(raw_transcript)
+    cache.put(cache_id, pipeline_hash, artifacts)
+    return artifacts
+
+ANSWER_PROMPT = PromptTemplate(
+    template="""
+    You are a helpful assistant analyzing a YouTube video transcript. You need to answer questions about the content of the video based ONLY on the transcript context provided.
+
+    IMPORTANT: 
+    - Provide a direct answer to the question based on the context.
+    - If you can find ANY relevant information in the transcript context that helps answer the question, include it.
+    - If the exact answer isn't in the context but you can infer a reasonable answer from what's provided, do so.
+    - Don't say words like according to the transcript or according to the context instead just provide the answer.
+    - Be polite , helpful and informative.
+    - Only say "I don't know" if there is absolutely nothing relevant to the question in the context.
+    - Be concise but complete in your answers.
+    - Context passages may start with a [m:ss] timestamp; when you use such a passage, cite its timestamp like (at 12:34).
+
+    Context:
+    {context}
+
+    Question: {question}
+
+    Answer:
+    """,
+    input_variables=["context", "question"],
+)
+
+COLLECTION_PROMPT = PromptTemplate(
+    template="""
+    You are a helpful assistant answering questions about a collection of YouTube videos, such as a course playlist. Answer based ONLY on the transcript context provided.
+
+    IMPORTANT: 
+    - Provide a direct answer to the question based on the context, combining what the different videos say.
+    - Don't say words like according to the transcript or according to the context instead just provide the answer.
+    - Be polite , helpful and informative.
+    - Only say "I don't know" if there is absolutely nothing relevant to the question in the context.
+    - Be concise but complete in your answers.
+    - Context passages start with [video id m:ss]; when you use a passage, cite its video and timestamp like (video abc123 at 12:34).
+
+    Context:
+    {context}
+
+    Question: {question}
+
+    Answer:
+    """,
+    input_variables=["context", "question"],
+)
+
+def _chunk_ids_in_range(artifacts, time_range):
+    """FAISS ids of chunks overlapping (start, end) seconds; chunks are indexed in position order"""
+    start, end = time_range
+    ids = []
+    for i, chunk in enumerate(artifacts.chunks):
+        chunk_start = chunk.metadata.get("start_time")
+        if chunk_start is None:
+            continue
+        chunk_end = chunk.metadata.get("end_time", chunk_start)
+        if chunk_start <= end and chunk_end >= start:
+            ids.append(i)
+    return ids
+
+def _vector_search(artifacts, query_vector, k, ids=None):
+    """Chunk ids nearest to the query vector, optionally pre-filtered to `ids` before the search"""
+    import faiss
+    import numpy as np
+    index = artifacts.vector_store.index
+    query = np.array([query_vector], dtype="float32")
+    params = None
+    if ids is not None:
+        if not ids:
+            return []
+        params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(np.array(ids, dtype="int64")))
+        k = min(k, len(ids))
+    _, indices = index.search(query, min(k, index.ntotal), params=params)
+    return [int(i) for i in indices[0] if i != -1]
+
+def _unit_vectors(artifacts, ids):
+    """{chunk id: L2-normalized embedding} read back from the FAISS index"""
+    import numpy as np
+    vectors = {}
+    for i in ids:
+        vector = artifacts.vector_store.index.reconstruct(i)
+        vectors[i] = vector / (np.linalg.norm(vector) or 1.0)
+    return vectors
+
+def _relevance(vectors, query_vector, lexical_scores):
+    """
+    Each candidate's relevance relative to the best candidate (1.0 = best), from raw scores:
+    cosine similarity to the query or BM25 score, whichever rates the chunk higher. RRF
+    scores only carry rank, so they can't tell a weak match from a strong one.
+    """
+    import numpy as np
+    query = np.asarray(query_vector, dtype="float32")
+    query = query / (np.linalg.norm(query) or 1.0)
+    cosine = {i: max(0.0, float(vector @ query)) for i, vector in vectors.items()}
+    best_cosine = max(cosine.values(), default=0.0)
+    best_lexical = max(lexical_scores.values(), default=0.0)
+    relevance = {}
+    for i in vectors:
+        score = cosine[i] / best_cosine if best_cosine > 0 else 0.0
+        if best_lexical > 0:
+            score = max(score, lexical_scores.get(i, 0.0) / best_lexical)
+        relevance[i] = score
+    return relevance
+
+def _mmr_select(artifacts, candidates, fused_scores, k, max_per_video=None, vectors=None):
+    """
+    Maximal marginal relevance over fused candidates: trade relevance against similarity to
+    chunks already picked, and skip near-duplicates left behind by chunk overlap. With
+    `max_per_video`, chunks of a video that already has that many picked are skipped.
+    """
+    vectors = vectors or _unit_vectors(artifacts, candidates)
+    top = max(fused_scores.values())
+    selected = []
+    per_video = {}
+    remaining = list(candidates)
+    while remaining and len(selected) < k:
+        best, best_score = None, None
+        for i in list(remaining):
+            if max_per_video and per_video.get(artifacts.chunks[i].metadata.get("video_id"), 0) >= max_per_video:
+                remaining.remove(i)
+                continue
+            redundancy = max((float(vectors[i] @ vectors[j]) for j in selected), default=0.0)
+            if redundancy >= RETRIEVAL_DEDUP_SIMILARITY:
+                remaining.remove(i)
+                continue
+            score = RETRIEVAL_MMR_LAMBDA * fused_scores[i] / top - (1 - RETRIEVAL_MMR_LAMBDA) * redundancy
+            if best_score is None or score > best_score:
+                best, best_score = i, score
+        if best is None:
+            break
+        selected.append(best)
+        remaining.remove(best)
+        video_id = artifacts.chunks[best].metadata.get("video_id")
+        per_video[video_id] = per_video.get(video_id, 0) + 1
+    return selected
+
+def format_chunk(doc):
+    """Chunk text prefixed with its video timestamp when one is known, and its video id in a collection"""
+    labels = [doc.metadata.get("video_id")]
+    start_time = doc.metadata.get("start_time")
+    if start_time is not None:
+        labels.append(format_timestamp(start_time))
+    labels = [label for label in labels if label]
+    if not labels:
+        return doc.page_content
+    return f"[{' '.join(labels)}] {doc.page_content}"
+
+def _chunk_span(doc):
+    """(video_id, start, end) of a chunk in its transcript; video_id is None outside collections"""
+    start = doc.metadata.get("start_index")
+    if start is None:
+        return None
+    return doc.metadata.get("video_id"), start, start + len(doc.page_content)
+
+def _trim_overlap(text, overlap):
+    """Drop the first `overlap` characters of a chunk, resuming at the next word"""
+    if overlap <= 0:
+        return text
+    cut = text.find(" ", overlap)
+    return text[cut + 1:] if cut != -1 else ""
+
+def _assemble(packed):
+    """
+    Prompt text for packed chunks: back in transcript order, with the text repeated by the
+    splitter's chunk overlap cut from the later chunk
+    """
+    packed = sorted(packed, key=lambda d: (d.metadata.get("video_id") or "", d.metadata.get("start_index", d.metadata.get("position", 0))))
+    parts = []
+    previous = None  # (video_id, end) of the text packed so far
+    for doc in packed:
+        span = _chunk_span(doc)
+        text = format_chunk(doc)
+        if span is not None and previous is not None and previous[0] == span[0] and span[1] < previous[1]:
+            trimmed = _trim_overlap(doc.page_content, previous[1] - span[1])
+            if not trimmed:
+                continue
+            text = format_chunk(Document(page_content=trimmed, metadata=doc.metadata))
+        parts.append(text)
+        if span is not None:
+            end = max(previous[1], span[2]) if previous is not None and previous[0] == span[0] else span[2]
+            previous = (span[0], end)
+    return "\n\n".join(parts)
+
+def pack_context(docs, relevance, budget=None):
+    """
+    Fit ranked chunks into a prompt token budget. `relevance` is each chunk's raw relevance
+    relative to the best candidate (see _relevance). Chunks far below the best one, or mostly
+    covered by a chunk already packed, are dropped. The budget is checked against the text
+    that actually goes into the prompt, after overlap trimming.
+    """
+    budget = budget or CONTEXT_TOKEN_BUDGET
+    packed, text, used = [], "", 0
+    
+    for doc, score in zip(docs, relevance):
+        if packed and score < CONTEXT_MIN_SCORE_RATIO:
+            continue
+        span = _chunk_span(doc)
+        if span is not None and any(
+            other is not None and other[0] == span[0]
+            and min(span[2], other[2]) - max(span[1], other[1]) > (span[2] - span[1]) / 2
+            for other in (_chunk_span(d) for d in packed)
+        ):
+            continue
+        candidate_text = _assemble(packed + [doc])
+        tokens = estimate_tokens(candidate_text)
+        if packed and tokens > budget:
+            continue
+        packed.append(doc)
+        text, used = candidate_text, tokens
+    
+    return text, used
+
+def retrieve_context(artifacts, user_query, time_range=None):
+    """Retrieve the chunks relevant to a query and join them into prompt context"""
+    with timed("retrieval"):
+        return _retrieve_context(artifacts, user_query, time_range)
+
+def _retrieve_context(artifacts, user_query, time_range):
+    logger.info("Retrieving relevant chunks")
+    k_chunks = 8 if artifacts.is_long_transcript else 5
+    fetch_k = k_chunks * 4
+    
+    time_range = time_range or parse_time_range(user_query)
+    ids = None
+    if time_range:
+        ids = _chunk_ids_in_range(artifacts, time_range)
+        if ids:
+            logger.info(f"Restricting retrieval to {time_range[0]:.0f}s-{time_range[1]:.0f}s")
+        else:
+            ids = None
+    
+    # Vector search finds paraphrases; BM25 finds the names, numbers and jargon embeddings blur
+    query_vector = artifacts.vector_store.embedding_function.embed_query(user_query)
+    rankings = [_vector_search(artifacts, query_vector, fetch_k, ids)]
+    lexical_scores = {}
+    if artifacts.lexical_index is not None:
+        allowed = set(ids) if ids is not None else None
+        lexical_scores = dict(artifacts.lexical_index.search(user_query, fetch_k, allowed))
+        rankings.append(list(lexical_scores))
+    
+    fused_scores = reciprocal_rank_fusion(rankings, k=RETRIEVAL_RRF_K)
+    candidates = sorted(fused_scores, key=fused_scores.get, reverse=True)
+    vectors = _unit_vectors(artifacts, candidates)
+    relevance = _relevance(vectors, query_vector, lexical_scores)
+    selected = _mmr_select(artifacts, candidates, fused_scores, k_chunks, vectors=vectors) if candidates else []
+    retrieved_docs = [artifacts.chunks[i] for i in selected]
+    
+    context_text, context_tokens = pack_context(retrieved_docs, [relevance[i] for i in selected])
+    
+    logger.info(f"Retrieved {len(retrieved_docs)} chunks from {len(candidates)} hybrid candidates, "
+                f"packed context: {context_tokens} tokens, {len(context_text)} chars")
+    return context_text
+
+def retrieve_collection_context(collection, user_query, query_vector=None, max_per_video=None):
+    """
+    Retrieve across every video of a collection with one vector search and one BM25 search
+    over its merged index, capping how many chunks any single video contributes
+    """
+    with timed("retrieval"):
+        if query_vector is None:
+            query_vector = embedding.embed_query(user_query)
+        max_per_video = max_per_video or COLLECTION_MAX_PER_VIDEO
+        fetch_k = COLLECTION_CHUNKS * 5
+        with collection.lock:
+            lexical_scores = dict(collection.lexical_index.search(user_query, fetch_k))
+            rankings = [_vector_search(collection, query_vector, fetch_k), list(lexical_scores)]
+            fused_scores = reciprocal_rank_fusion(rankings, k=RETRIEVAL_RRF_K)
+            candidates = sorted(fused_scores, key=fused_scores.get, reverse=True)
+            vectors = _unit_vectors(collection, candidates)
+            relevance = _relevance(vectors, query_vector, lexical_scores)
+            selected = _mmr_select(collection, candidates, fused_scores, COLLECTION_CHUNKS, max_per_video, vectors) if candidates else []
+            retrieved_docs = [collection.chunks[i] for i in selected]
+        
+        context_text, context_tokens = pack_context(
+            retrieved_docs, [relevance[i] for i in selected], COLLECTION_CONTEXT_TOKEN_BUDGET
+        )
+        videos = len({doc.metadata.get("video_id") for doc in retrieved_docs})
+        logger.info(f"Retrieved {len(retrieved_docs)} chunks from {videos} of {len(collection.fingerprints)} videos, "
+                    f"packed context: {context_tokens} tokens")
+        return context_text
+
+def wants_summary(artifacts, user_query, time_range=None):
+    """Route overview questions on long videos to the summary tree instead of k-NN retrieval"""
+    return (artifacts.is_long_transcript and not (time_range or parse_time_range(user_query))
+            and is_overview_question(user_query))
+
+def build_context(artifacts, cache_id, user_query, time_range=None):
+    """Prompt context for a question: the video summary for overview questions, retrieved chunks otherwise"""
+    if wants_summary(artifacts, user_query, time_range):
+        logger.info("Overview question, answering from the video summary")
+        with timed("summary"):
+            summary = get_video_summary(artifacts, cache_id, INTERACTIVE)
+        if summary is not None:
+            return summary_context(summary)
+        logger.warning("Video summary incomplete, falling back to retrieval")
+    return retrieve_context(artifacts, user_query, time_range)
+
+DONT_KNOW_ANSWERS = ["i don't know.", "i don't know", "i do not know", "i do not know."]
+
+def _is_dont_know(answer):
+    return answer.lower() in DONT_KNOW_ANSWERS
+
+def _fallback_prompt(context, question):
+    return "Based on this YouTube video transcript extract, please answer this question as best you can: " + question + "\n\nTranscript context:\n" + context
+
+def generate_answer(context, question, prompt=ANSWER_PROMPT):
+    """Answer a question from retrieved context, retrying with a looser prompt on "I don't know" """
+    logger.info("Generating answer")
+    with timed("generation"):
+        return _generate_answer(context, question, prompt)
+
+def _generate_answer(context, question, prompt=ANSWER_PROMPT):
+    llm = get_llm()
+    
+    response = llm.invoke(prompt.format(context=context, question=question))
+    answer = response.content.strip()
+    
+    if _is_dont_know(answer):
+        fallback_response = llm.invoke(_fallback_prompt(context, question))
+        answer = fallback_response.content.strip()
+    
+    return answer
+
+async def agenerate_answer(context, question, prompt=ANSWER_PROMPT):
+    """Async variant of generate_answer using the LLM's native async client"""
+    logger.info("Generating answer")
+    with timed("generation"):
+        return await _agenerate_answer(context, question, prompt)
+
+async def _agenerate_answer(context, question, prompt=ANSWER_PROMPT):
+    llm = get_llm()
+    
+    response = await llm.ainvoke(prompt.format(context=context, question=question))
+    answer = response.content.strip()
+    
+    if _is_dont_know(answer):
+        fallback_response = await llm.ainvoke(_fallback_prompt(context, question))
+        answer = fallback_response.content.strip()
+    
+    return answer
+
+async def astream_answer(context, question):
+    """
+    Stream answer tokens. Output is held back while it could still be an "I don't know",
+    in which case the fallback prompt is streamed instead.
+    """
+    llm = get_llm()
+    buffer = ""
+    flushed = False
+    
+    async for token in llm.astream(ANSWER_PROMPT.format(context=context, question=question)):
+        if flushed:
+            yield token
+            continue
+        buffer += token
+        candidate = buffer.strip().lower()
+        if not any(phrase.startswith(candidate) for phrase in DONT_KNOW_ANSWERS):
+            flushed = True
+            yield buffer.lstrip()
+    
+    if flushed:
+        return
+    if _is_dont_know(buffer.strip()):
+        async for token in llm.astream(_fallback_prompt(context, question)):
+            yield token
+    elif buffer.strip():
+        yield buffer.strip()
+
+def lookup_cached_answer(artifacts, cache_id, user_query, time_range=None):
+    """
+    Return (answer, query_vector): a cached answer to an equivalent question, if any, plus
+    the query embedding to store the new answer under. Time-scoped questions aren't cached.
+    """
+    if time_range or parse_time_range(user_query):
+        return None, None
+    with timed("answer_cache_lookup"):
+        query_vector = embedding.embed_query(user_query)
+        return get_answer_cache().lookup(cache_id, artifacts.fingerprint, query_vector), query_vector
+
+def remember_answer(artifacts, cache_id, user_query, query_vector, answer):
+    if query_vector is not None and answer:
+        get_answer_cache().store_answer(cache_id, artifacts.fingerprint, user_query, query_vector, answer)
+
+def answer_youtube_video(raw_transcript, user_query, video_id=None, time_range=None):
+    """
+    Answers a user query about a YouTube video, raising on any failure. Used where an error
+    must not pass for an answer, like long-video jobs whose results are reused.
+    """
+    start_time = time.time()
+    
+    cache_id = video_id or transcript_fingerprint(raw_transcript)
+    artifacts = get_video_artifacts(raw_transcript, video_id)
+    cached_answer, query_vector = lookup_cached_answer(artifacts, cache_id, user_query, time_range)
+    if cached_answer is not None:
+        return cached_answer
+    
+    context = build_context(artifacts, cache_id, user_query, time_range)
+    answer = generate_answer(context, user_query)
+    remember_answer(artifacts, cache_id, user_query, query_vector, answer)
+    
+    end_time = time.time()
+    logger.info(f"Total processing time: {end_time - start_time:.2f} seconds")
+    return answer
+
+def process_youtube_video(raw_transcript, user_query, video_id=None, time_range=None):
     """
     Processes a YouTube video and answers a user query based on its transcript.
-    Optimized for longer videos with rate limiting.
+    Optimized for longer videos with rate limiting. Failures come back as a message.
     
     """
     
+    try:
+        return answer_youtube_video(raw_transcript, user_query, video_id, time_range)
+    except Exception as e:
+        logger.error(f"Error in process_youtube_video: {str(e)}", exc_info=True)
+        return f"An error occurred while processing the video: {str(e)}"
+
+async def aanswer_youtube_video(raw_transcript, user_query, video_id=None, executor=None, time_range=None):
+    """
+    Async version of answer_youtube_video for the API: index building and retrieval run on
+    the given executor, the LLM call is awaited natively. Raises on any failure.
+    """
+    
+    loop = asyncio.get_running_loop()
+    start_time = time.time()
+    
+    cache_id = video_id or transcript_fingerprint(raw_transcript)
+    artifacts = await run_in_executor(loop, executor, get_video_artifacts, raw_transcript, video_id)
+    cached_answer, query_vector = await run_in_executor(
+        loop, executor, lookup_cached_answer, artifacts, cache_id, user_query, time_range
+    )
+    if cached_answer is not None:
+        return cached_answer
+    
+    context = await run_in_executor(loop, executor, build_context, artifacts, cache_id, user_query, time_range)
+    answer = await agenerate_answer(context, user_query)
+    await run_in_executor(loop, executor, remember_answer, artifacts, cache_id, user_query, query_vector, answer)
+    
+    end_time = time.time()
+    logger.info(f"Total processing time: {end_time - start_time:.2f} seconds")
+    return answer
+
+async def astream_youtube_video(raw_transcript, user_query, video_id=None, executor=None, time_range=None):
+    """
+    Streaming version of aanswer_youtube_video. Yields (event, data) pairs:
+    ("status", message) while preparing, ("token", text) for each answer token,
+    then ("done", full_answer) or ("error", message).
+    """
+    
+    loop = asyncio.get_running_loop()
     try:
         start_time = time.time()
         
-        logger.info("Processing transcript")
-        translated_transcript = process_transcript(raw_transcript)
-        cleaned_transcript = clean_transcript(translated_transcript)
-        
-        is_long_transcript = len(cleaned_transcript) > 15000
-        
-        if not is_long_transcript:
-            logger.info("Improving transcript with LLM")
-            improved_transcript = improve_transcript_with_llm(cleaned_transcript)
-        else:
-            logger.info("Skipping LLM transcript improvement due to length")
-            improved_transcript = cleaned_transcript
-            
-        logger.info("Creating semantic chunks")
-        chunked_transcript = create_semantic_chunks(improved_transcript)
-        logger.info(f"Created {len(chunked_transcript)} chunks")
-        
-        
-        logger.info("Creating vector store")
-        vector_store = FAISS.from_documents(chunked_transcript, embedding)
-        
-        
-        rewritten_query = user_query
-        
-        
-        logger.info("Retrieving relevant chunks")
-        k_chunks = 8 if is_long_transcript else 5
+        yield "status", "Preparing transcript"
+        cache_id = video_id or transcript_fingerprint(raw_transcript)
+        artifacts = await run_in_executor(loop, executor, get_video_artifacts, raw_transcript, video_id)
         
-        retriever = vector_store.as_retriever(
-            search_type="similarity", 
-            search_kwargs={"k": k_chunks}
+        cached_answer, query_vector = await run_in_executor(
+            loop, executor, lookup_cached_answer, artifacts, cache_id, user_query, time_range
         )
-        retrieved_docs = retriever.invoke(rewritten_query)
+        if cached_answer is not None:
+            yield "token", cached_answer
+            yield "done", cached_answer
+            return
         
-        context_text = "\n\n".join(doc.page_content for doc in retrieved_docs)
+        if wants_summary(artifacts, user_query, time_range):
+            yield "status", "Summarizing the video"
+        else:
+            yield "status", "Finding relevant parts of the video"
+        context = await run_in_executor(loop, executor, build_context, artifacts, cache_id, user_query, time_range)
         
-        logger.info(f"Retrieved {len(retrieved_docs)} chunks, total context length: {len(context_text)}")
+        yield "status", "Generating answer"
+        parts = []
+        with timed("generation"):
+            async for token in astream_answer(context, user_query):
+                parts.append(token)
+                yield "token", token
         
-        logger.info("Generating answer")
+        answer = "".join(parts).strip()
+        await run_in_executor(loop, executor, remember_answer, artifacts, cache_id, user_query, query_vector, answer)
         
-        enhanced_prompt = PromptTemplate(
-            template="""
-            You are a helpful assistant analyzing a YouTube video transcript. You need to answer questions about the content of the video based ONLY on the transcript context provided.
-
-            IMPORTANT: 
-            - Provide a direct answer to the question based on the context.
-            - If you can find ANY relevant information in the transcript context that helps answer the question, include it.
-            - If the exact answer isn't in the context but you can infer a reasonable answer from what's provided, do so.
-            - Don't say words like according to the transcript or according to the context instead just provide the answer.
-            - Be polite , helpful and informative.
-            - Only say "I don't know" if there is absolutely nothing relevant to the question in the context.
-            - Be concise but complete in your answers.
-
-            Context:
-            {context}
-
-            Question: {question}
-
-            Answer:
-            """,
-            input_variables=["context", "question"],
-        )
-
-        def format_docs(retrieved_docs):
-            context_text = "\n\n".join(doc.page_content for doc in retrieved_docs)
-            return context_text
-
-        llm = get_llm()
+        end_time = time.time()
+        logger.info(f"Total processing time: {end_time - start_time:.2f} seconds")
+        yield "done", answer
         
-        try:
-            
-            context = format_docs(retrieved_docs)
-            prompt_text = enhanced_prompt.format(context=context, question=rewritten_query)
-            
-            response = llm.invoke(prompt_text)
-            answer = response.content.strip()
-            
-            
-            if answer.lower() in ["i don't know.", "i don't know", "i don't know", "i do not know"]:
-                
-                fallback_prompt = "Based on this YouTube video transcript extract, please answer this question as best you can: " + rewritten_query + "\n\nTranscript context:\n" + context
-                fallback_response = llm.invoke(fallback_prompt)
-                answer = fallback_response.content.strip()
-            
-            
-            end_time = time.time()
-            logger.info(f"Total processing time: {end_time - start_time:.2f} seconds")
-            
-            return answer
-            
-        except Exception as e:
-            logger.error(f"Error generating answer: {str(e)}")
-            return f"I'm sorry, I encountered an error while analyzing this video. Error: {str(e)}"
-
     except Exception as e:
-        logger.error(f"Error in process_youtube_video: {str(e)}", exc_info=True)
-        return f"An error occurred while processing the video: {str(e)}"
+        logger.error(f"Error in astream_youtube_video: {str(e)}", exc_info=True)
+        yield "error", f"An error occurred while processing the video: {str(e)}"
 
+async def aanswer_collection(collection, user_query, executor=None, max_per_video=None):
+    """
+    Answer a question across a video collection: one query embedding, one search over the
+    merged index, one LLM call. Answers are cached per collection until a video is added.
+    Raises on any failure.
+    """
+    
+    loop = asyncio.get_running_loop()
+    start_time = time.time()
+    
+    cache_id = f"collection:{collection.collection_id}"
+    cached_answer, query_vector = await run_in_executor(
+        loop, executor, lookup_cached_answer, collection, cache_id, user_query
+    )
+    if cached_answer is not None:
+        return cached_answer
+    
+    context = await run_in_executor(
+        loop, executor, retrieve_collection_context, collection, user_query, query_vector, max_per_video
+    )
+    
+    answer = await agenerate_answer(context, user_query, COLLECTION_PROMPT)
+    await run_in_executor(loop, executor, remember_answer, collection, cache_id, user_query, query_vector, answer)
+    
+    end_time = time.time()
+    logger.info(f"Total processing time: {end_time - start_time:.2f} seconds")
+    return answer
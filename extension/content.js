@@ -84,38 +84,40 @@
           return;
         }
         
-        // Poll for results
-        fetch(`http://localhost:5000/check_result?videoId=${queryData.videoId}&query=${encodeURIComponent(queryData.query)}`)
+        // Poll the job status
+        fetch(`http://localhost:5000/jobs/${queryData.jobId}`)
           .then(r => r.json())
           .then(data => {
-            if (data.found) {
-              // We got a result!
+            if (data.status === 'done' || data.status === 'failed' || !data.status) {
+              const answer = data.status === 'done'
+                ? data.answer
+                : 'Sorry, I could not finish analyzing this video. Please try again.';
               const msgId = queryData.messageId;
               const existingMsg = document.getElementById(msgId);
               
               if (existingMsg) {
                 // Update existing message
-                existingMsg.textContent = data.answer;
+                existingMsg.textContent = answer;
                 
                 // Update in storage
                 chrome.storage.local.get([VIDEO_ID], ({[VIDEO_ID]:h=[]}) => {
                   // Find and update the message
                   const updatedHistory = h.map(msg => {
                     if (msg.id === msgId) {
-                      return {...msg, text: data.answer};
+                      return {...msg, text: answer};
                     }
                     return msg;
                   });
                   chrome.storage.local.set({[VIDEO_ID]: updatedHistory});
                 });
-                
-                // Remove from active queries
-                delete activeQueries[queryKey];
               }
+              
+              // Remove from active queries
+              delete activeQueries[queryKey];
             }
           })
           .catch(e => {
-            console.error('Error checking results:', e);
+            console.error('Error checking job status:', e);
           });
       });
       
@@ -142,6 +144,106 @@
     });
     
     showSpinner();
+    streamQuery(q, messageId).catch(e=>{
+      const partial = document.getElementById(messageId);
+      if(partial){
+        partial.textContent += ' [connection lost: '+e.message+']';
+        storeAnswer(partial.textContent, messageId);
+        return;
+      }
+      // Older backends without /query/stream: fall back to the blocking endpoint
+      console.warn('Streaming failed, falling back to /query:', e);
+      blockingQuery(q, messageId);
+    });
+  }
+  
+  function storeAnswer(text, messageId){
+    chrome.storage.local.get([VIDEO_ID],({[VIDEO_ID]:h=[]})=>{
+      h.push({role:'assistant', text:text, id: messageId});
+      chrome.storage.local.set({[VIDEO_ID]:h});
+    });
+  }
+  
+  // Reads Server-Sent Events from /query/stream and renders tokens as they arrive
+  async function streamQuery(q, messageId){
+    const r = await fetch('http://localhost:5000/query/stream',{
+      method:'POST',
+      headers:{'Content-Type':'application/json'},
+      body:JSON.stringify({videoId:VIDEO_ID,query:q})
+    });
+    if(!r.ok || !r.body) throw new Error('HTTP '+r.status);
+    
+    const reader = r.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let msgEl = null;
+    let answer = '';
+    let finished = false;
+    
+    const ensureMessage = () => {
+      if(msgEl) return msgEl;
+      removeSpinner();
+      msgEl = document.createElement('div');
+      msgEl.classList.add('message', 'assistant');
+      msgEl.id = messageId;
+      messagesEl.appendChild(msgEl);
+      return msgEl;
+    };
+    
+    const handleEvent = (event, data) => {
+      if(event === 'status'){
+        const s = document.getElementById('loading-spinner');
+        if(s) s.title = data;
+      } else if(event === 'token'){
+        answer += data;
+        ensureMessage().textContent = answer;
+        messagesEl.scrollTop = messagesEl.scrollHeight;
+      } else if(event === 'job'){
+        // Long videos are answered by a background job: show the placeholder and poll it
+        finished = true;
+        ensureMessage().textContent = data.message;
+        storeAnswer(data.message, messageId);
+        activeQueries[data.job_id] = {
+          jobId: data.job_id,
+          messageId: messageId,
+          timestamp: Date.now()
+        };
+        startPolling();
+      } else if(event === 'done' || event === 'error'){
+        finished = true;
+        const text = event === 'done' ? (data || answer || 'No response') : 'Error: '+data;
+        ensureMessage().textContent = text;
+        messagesEl.scrollTop = messagesEl.scrollHeight;
+        storeAnswer(text, messageId);
+      }
+    };
+    
+    while(true){
+      const {value, done} = await reader.read();
+      if(done) break;
+      buffer += decoder.decode(value, {stream:true});
+      let sep;
+      while((sep = buffer.indexOf('\n\n')) !== -1){
+        const raw = buffer.slice(0, sep);
+        buffer = buffer.slice(sep + 2);
+        let event = 'message', data = '';
+        raw.split('\n').forEach(line => {
+          if(line.startsWith('event: ')) event = line.slice(7);
+          else if(line.startsWith('data: ')) data += line.slice(6);
+        });
+        handleEvent(event, data ? JSON.parse(data) : '');
+      }
+    }
+    
+    if(!finished){
+      removeSpinner();
+      const text = answer || 'Error: connection closed before the answer was complete';
+      ensureMessage().textContent = text;
+      storeAnswer(text, messageId);
+    }
+  }
+  
+  function blockingQuery(q, messageId){
     fetch('http://localhost:5000/query',{
       method:'POST',
       headers:{'Content-Type':'application/json'},
@@ -161,17 +263,12 @@
         messagesEl.scrollTop = messagesEl.scrollHeight;
         
         // Store in history
-        chrome.storage.local.get([VIDEO_ID],({[VIDEO_ID]:h=[]})=>{
-          h.push({role:'assistant', text:a, id: messageId});
-          chrome.storage.local.set({[VIDEO_ID]:h});
-        });
+        storeAnswer(a, messageId);
         
-        // If this is a processing message, add to active queries for polling
-        if(a.includes("analyzing this long video")) {
-          // Add to active queries
-          activeQueries[`${VIDEO_ID}:${q}`] = {
-            videoId: VIDEO_ID,
-            query: q, 
+        // If the answer is still being computed, poll its job until it finishes
+        if(d.job_id && d.status !== 'done') {
+          activeQueries[d.job_id] = {
+            jobId: d.job_id,
             messageId: messageId,
             timestamp: Date.now()
           };